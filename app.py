@@ -1,18 +1,61 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
+import atexit
+import json
+import logging
+import math
 import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+from config import Config
 
 from src.arxiv_search import ArxivSearcher
 from src.serpapi_search import SerpAPISearcher
 from src.google_search import GoogleSearcher
 from src.web_scraper import WebScraper
+from src.knowledge_base import KnowledgeBase
 from src.query_processor import QueryProcessor
 from src.rag_engine import RAGEngine
+from src.pipeline import QueryPipeline
+from src.admission import AdmissionController, AdmissionRejected
+from src.answer_cache import AnswerCache
+from src.source_selector import SourceSelector
+from src.prewarm import QueryPrewarmer
+from src.session_store import SessionStore
+from src import metrics
+from src.profiling import Profiler
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
+
+def _configure_logging():
+    """Leveled logging (LOG_LEVEL); records are written by a background thread, off the request path"""
+    logging.getLogger().setLevel(os.getenv('LOG_LEVEL', Config.LOG_LEVEL).upper())
+    _start_log_listener()
+
+    # The writer thread does not survive fork (gunicorn --preload): give each worker its own
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_start_log_listener)
+
+
+def _start_log_listener():
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    listener = QueueListener(log_queue, handler)
+
+    logging.getLogger().handlers = [QueueHandler(log_queue)]
+    listener.start()
+    atexit.register(listener.stop)
+
+
+_configure_logging()
+
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', 'dev-secret-key')
 CORS(app)
@@ -24,119 +67,210 @@ google_searcher = GoogleSearcher(
     api_key=os.getenv('GOOGLE_API_KEY'),
     cse_id=os.getenv('GOOGLE_CSE_ID')
 )
-web_scraper = WebScraper()
-query_processor = QueryProcessor()
 
 # Initialize RAG engine
-print("\n[INIT] Initializing RAG Engine...")
+logger.info('[INIT] Initializing RAG Engine...')
 rag_engine = RAGEngine(groq_api_key=os.getenv('GROQ_API_KEY'))
 
+# Offline knowledge base with precomputed embeddings
+web_scraper = WebScraper(knowledge_base=KnowledgeBase(encoder=rag_engine.encode))
 
-@app.route('/')
-def index():
-    return render_template('index.html')
+# Topic gate reuses the engine's embedding model for ambiguous queries
+query_processor = QueryProcessor(encoder=rag_engine.encode)
+
+# Admission control: separate caps for whole pipeline runs and for Groq calls
+pipeline_admission = AdmissionController(
+    'pipeline',
+    max_concurrent=Config.PIPELINE_MAX_CONCURRENT,
+    max_queue=Config.PIPELINE_MAX_QUEUE,
+    queue_timeout=Config.PIPELINE_QUEUE_TIMEOUT
+)
+rag_engine.llm_limiter = AdmissionController(
+    'llm',
+    max_concurrent=Config.LLM_MAX_CONCURRENT,
+    max_queue=Config.LLM_MAX_QUEUE,
+    queue_timeout=Config.LLM_QUEUE_TIMEOUT
+)
+profiler = Profiler(Config.PROFILE_DIR, Config.PROFILE_SAMPLE_RATE, Config.PROFILE_TOKEN)
+answer_cache = AnswerCache(Config.ANSWER_CACHE_SIZE, Config.ANSWER_CACHE_TTL)
+
+for controller in (pipeline_admission, rag_engine.llm_limiter):
+    metrics.ADMISSION_QUEUE_DEPTH.set_function(lambda c=controller: c.stats()['queue_depth'], controller=controller.name)
+    metrics.ADMISSION_ACTIVE.set_function(lambda c=controller: c.stats()['active'], controller=controller.name)
+source_selector = SourceSelector() if Config.SOURCE_SELECTION_ENABLED else None
+
+pipeline = QueryPipeline(
+    arxiv_searcher=arxiv_searcher,
+    serpapi_searcher=serpapi_searcher,
+    google_searcher=google_searcher,
+    web_scraper=web_scraper,
+    query_processor=query_processor,
+    rag_engine=rag_engine,
+    answer_cache=answer_cache,
+    source_selector=source_selector
+)
 
+# Conversation sessions: per-session documents and history for follow-up questions
+sessions = SessionStore()
 
-@app.route('/api/query', methods=['POST'])
-def process_query():
+# Keep the most popular questions answered ahead of their cache expiry.
+# Started by the first request each process serves (see start_prewarmer)
+prewarmer = QueryPrewarmer(pipeline, answer_cache, admission=pipeline_admission)
+if Config.PREWARM_ENABLED:
+    atexit.register(prewarmer.stop)
+
+
+def _request_timeout():
+    """Optional client deadline for queueing, from the X-Request-Timeout header (seconds)"""
     try:
-        data = request.json
-        user_query = data.get('query', '')
+        timeout = float(request.headers['X-Request-Timeout'])
+    except (KeyError, ValueError):
+        return None
+    # nan/inf would never expire; negative means "do not queue"
+    return max(0.0, timeout) if math.isfinite(timeout) else None
 
-        if not user_query:
-            return jsonify({'error': 'No query provided'}), 400
 
-        # Process and validate query
-        processed_query = query_processor.process(user_query)
+def _overloaded(error: AdmissionRejected):
+    response = jsonify({'error': 'Server is busy, please retry shortly'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
 
-        if not query_processor.is_quantum_related(processed_query):
-            return jsonify({
-                'error': 'Query must be related to quantum mechanics or quantum computing'
-            }), 400
 
-        print(f"\n{'=' * 70}")
-        print(f"[RAG PIPELINE] Query: {processed_query}")
-        print(f"{'=' * 70}\n")
+@app.before_request
+def start_prewarmer():
+    # Per process and after any fork, so a gunicorn --preload master never warms its own unused cache
+    if Config.PREWARM_ENABLED:
+        prewarmer.start()
 
-        # Step 1: Retrieve from multiple sources
-        print("📚 Step 1: Multi-source retrieval...")
-        arxiv_results = arxiv_searcher.search(processed_query)
-        print(f"   ✓ arXiv: {len(arxiv_results)} papers")
 
-        all_web_results = []
+@app.after_request
+def count_request(response):
+    if request.path.startswith('/api/'):
+        # Label by route, not raw path, so unknown URLs cannot create new series
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        metrics.REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+    return response
 
-        if serpapi_searcher.is_configured():
-            serpapi_results = serpapi_searcher.search(processed_query)
-            all_web_results.extend(serpapi_results)
-            print(f"   ✓ SerpAPI: {len(serpapi_results)} results")
 
-        if google_searcher.is_configured():
-            google_results = google_searcher.search(processed_query)
-            all_web_results.extend(google_results)
-            print(f"   ✓ Google: {len(google_results)} results")
+@app.route('/')
+def index():
+    return render_template('index.html')
 
-        web_results = web_scraper.search_all(processed_query)
-        all_web_results.extend(web_results)
-        print(f"   ✓ Web Scraping: {len(web_results)} results")
 
-        # Step 2: Prepare documents for RAG
-        all_documents = []
+@app.route('/sw.js')
+def service_worker():
+    """Served from the site root so the worker's scope covers the whole app"""
+    response = send_from_directory(app.static_folder, 'js/sw.js', mimetype='application/javascript')
+    # Browsers must always see the latest worker so cache-version bumps take effect
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
-        for paper in arxiv_results:
-            all_documents.append({
-                'title': paper['title'],
-                'snippet': paper['summary'][:700],
-                'link': paper['link'],
-                'source_type': 'arXiv'
-            })
 
-        for result in all_web_results:
-            all_documents.append({
-                'title': result['title'],
-                'snippet': result['snippet'][:700],
-                'link': result['link'],
-                'source_type': result.get('source', 'Web')
-            })
+@app.route('/api/query', methods=['POST'])
+def process_query():
+    try:
+        data = request.json
+        user_query = data.get('query', '')
+
+        # "session": true starts a conversation; "session_id" continues one (or restarts it if expired)
+        session = None
+        if data.get('session_id') or data.get('session'):
+            session_id = data.get('session_id')
+            session = sessions.get_or_create(str(session_id) if session_id else None)
+
+        # Cached answers never wait in the admission queue
+        cached = pipeline.cached_answer(user_query) if session is None else None
+        if cached is not None:
+            prewarmer.record(user_query)
+            return jsonify(cached)
+
+        try:
+            with pipeline_admission.slot(timeout=_request_timeout()), \
+                    profiler.maybe_profile(request.headers.get('X-Profile'), label=user_query) as profile, \
+                    metrics.stage('pipeline'):
+                if session is not None:
+                    result = pipeline.answer_in_session(user_query, session)
+                else:
+                    result = pipeline.answer(user_query)
+        except AdmissionRejected as e:
+            logger.warning('⚠ Rejected query: %s', e)
+            return _overloaded(e)
+
+        response = jsonify(result)
+        if profile is not None:
+            response.headers['X-Profile-Id'] = profile.profile_id
+
+        if 'error' in result:
+            return response, 400
+
+        if session is None:
+            prewarmer.record(user_query)
+        return response
+
+    except Exception as e:
+        logger.exception('❌ ERROR: %s', e)
+        return jsonify({'error': str(e)}), 500
 
-        print(f"\n🔍 Step 2: Indexing {len(all_documents)} documents...")
 
-        # Step 3: Add to vector DB
-        rag_engine.reset()
-        rag_engine.add_documents(all_documents)
+@app.route('/api/query/batch', methods=['POST'])
+def process_query_batch():
+    try:
+        data = request.json or {}
+        queries = data.get('queries', [])
 
-        # Step 4: Semantic search
-        print(f"\n🎯 Step 3: Semantic search...")
-        retrieved_docs = rag_engine.retrieve(processed_query, top_k=8)
+        if not isinstance(queries, list) or not queries:
+            return jsonify({'error': 'No queries provided'}), 400
 
-        # Step 5: Generate answer with LLM
-        print(f"\n🤖 Step 4: Generating answer...")
-        result = rag_engine.generate_answer(processed_query, retrieved_docs)
+        if len(queries) > Config.BATCH_MAX_QUERIES:
+            return jsonify({
+                'error': f'At most {Config.BATCH_MAX_QUERIES} queries per batch'
+            }), 400
 
-        print(f"\n✅ Complete! Generated by: {result['generated_by']}")
-        print(f"{'=' * 70}\n")
+        queries = [str(query) for query in queries]
+
+        # A batch holds one pipeline slot for its whole run
+        try:
+            pipeline_admission.acquire(timeout=_request_timeout())
+        except AdmissionRejected as e:
+            logger.warning('⚠ Rejected batch: %s', e)
+            return _overloaded(e)
+
+        # Stream one JSON object per line as answers complete
+        if data.get('stream') or 'application/x-ndjson' in request.headers.get('Accept', ''):
+            def generate():
+                for item in pipeline.iter_batch(queries):
+                    yield json.dumps(item) + '\n'
+
+            # Released when the server closes the response, even if the body was never iterated
+            try:
+                response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+            except Exception:
+                pipeline_admission.release()
+                raise
+            response.call_on_close(pipeline_admission.release)
+            return response
+
+        try:
+            results = pipeline.answer_batch(queries)
+        finally:
+            pipeline_admission.release()
 
         return jsonify({
             'success': True,
-            'query': user_query,
-            'structured_answer': result['structured_answer'],
-            'sources': result['sources'],
-            'confidence': result['confidence'],
-            'debug': {
-                'arxiv_count': len(arxiv_results),
-                'web_count': len(all_web_results),
-                'total_docs': len(all_documents),
-                'retrieved_docs': len(retrieved_docs),
-                'generated_by': result['generated_by']
-            }
+            'results': results
         })
 
     except Exception as e:
-        print(f"❌ ERROR: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception('❌ BATCH ERROR: %s', e)
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({
@@ -149,7 +283,15 @@ def health_check():
             'rag_engine': True,
             'llm': rag_engine.llm_available,
             'llm_model': rag_engine.model_name if rag_engine.llm_available else None
-        }
+        },
+        'admission': {
+            'pipeline': pipeline_admission.stats(),
+            'llm': rag_engine.llm_limiter.stats(),
+            'cached_answers': len(answer_cache),
+            'sessions': len(sessions)
+        },
+        'source_selection': source_selector.stats() if source_selector else None,
+        'prewarm': prewarmer.stats() if Config.PREWARM_ENABLED else None
     })
 
 
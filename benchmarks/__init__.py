@@ -0,0 +1 @@
+"""Offline benchmarks for the RAG pipeline's hot paths (see benchmarks/run.py)"""
@@ -0,0 +1,152 @@
+"""Local stand-ins for every upstream the pipeline talks to.
+
+`offline()` routes requests.get to recorded fixture responses (arXiv Atom XML,
+Wikipedia opensearch/extracts, SerpAPI), replaces the Google CSE client and
+refuses any other outbound HTTP. `FakeGroq` mimics the streaming chat
+completions API the RAG engine uses.
+"""
+import io
+import json
+import os
+import re
+import zlib
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Dict, List
+from unittest import mock
+import numpy as np
+import requests
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURE_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+
+class FakeResponse:
+    """Just enough of requests.Response for the searchers"""
+
+    def __init__(self, body: str, status_code: int = 200):
+        self.text = body
+        self.content = body.encode('utf-8')
+        self.status_code = status_code
+        self.raw = io.BytesIO(self.content)
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'{self.status_code} from fixture')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FixtureHTTP:
+    """Replacement for requests.get that answers from fixtures by URL"""
+
+    def __init__(self):
+        self.arxiv = load_fixture('arxiv_query.xml')
+        self.opensearch = load_fixture('wikipedia_opensearch.json')
+        self.extracts = load_fixture('wikipedia_extracts.json')
+        self.serpapi = load_fixture('serpapi.json')
+        self.calls = 0
+
+    def get(self, url: str, params: Dict = None, **kwargs) -> FakeResponse:
+        self.calls += 1
+        params = params or {}
+
+        if 'arxiv.org' in url:
+            return FakeResponse(self.arxiv)
+        if 'wikipedia.org' in url:
+            if params.get('action') == 'opensearch':
+                return FakeResponse(self.opensearch)
+            return FakeResponse(self.extracts)
+        if 'serpapi.com' in url:
+            return FakeResponse(self.serpapi)
+
+        raise requests.ConnectionError(f'benchmarks are offline; no fixture for {url}')
+
+
+class FakeCSEService:
+    """Stand-in for googleapiclient's customsearch service"""
+
+    def __init__(self, payload: Dict):
+        self.payload = payload
+
+    def cse(self):
+        return self
+
+    def list(self, **kwargs):
+        return self
+
+    def execute(self) -> Dict:
+        return json.loads(json.dumps(self.payload))
+
+
+class FakeGroq:
+    """Groq client whose chat completions replay a recorded answer.
+
+    With stream=True it yields chunks shaped like Groq's
+    (`chunk.choices[0].delta.content`), a few words at a time.
+    """
+
+    def __init__(self, answer_text: str = None, words_per_chunk: int = 3):
+        self.answer_text = answer_text if answer_text is not None else load_fixture('llm_answer.txt')
+        words = re.findall(r'\S+\s*', self.answer_text)
+        self.pieces = [''.join(words[i:i + words_per_chunk]) for i in range(0, len(words), words_per_chunk)]
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model: str, messages: List[Dict], stream: bool = False, **kwargs):
+        if not stream:
+            message = SimpleNamespace(content=self.answer_text)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+        return self._stream()
+
+    def _stream(self):
+        for piece in self.pieces:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None))])
+
+
+class HashEmbedder:
+    """Deterministic bag-of-words embedder with SentenceTransformer's encode() signature.
+
+    Used with --embedder hash to benchmark everything around the model, or when
+    the real model is not in the local cache.
+    """
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(self, texts: List[str], batch_size: int = 32, show_progress_bar: bool = False,
+               normalize_embeddings: bool = False) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r'\w+', text.lower()):
+                embeddings[row, zlib.crc32(word.encode()) % self.dimension] += 1.0
+
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings /= np.maximum(norms, 1e-12)
+        return embeddings
+
+
+@contextmanager
+def offline():
+    """Serve all upstream HTTP from fixtures for the duration of the block"""
+    http = FixtureHTTP()
+    google = FakeCSEService(json.loads(load_fixture('google_cse.json')))
+
+    with mock.patch('requests.get', http.get), \
+            mock.patch('src.google_search.build', lambda *args, **kwargs: google):
+        yield http
@@ -0,0 +1,487 @@
+"""Load-test the served app against local stub upstreams.
+
+Starts the stubs from benchmarks/stub_servers.py, launches gunicorn for every
+--workers x --threads combination (or targets an already running server with
+--target), and drives POST /api/query with a replayed query log or a Zipf mix
+of quantum questions.
+
+  closed loop  --concurrency N: N clients each send their next query as soon as
+               the previous one returns (measures capacity at fixed concurrency)
+  open loop    --rate R: queries arrive as a Poisson process at R/s regardless of
+               how fast the server answers; latency is measured from the scheduled
+               arrival, so queueing is not hidden (finds the saturation point)
+
+Comma-separated --concurrency/--rate values sweep the load on each server
+configuration. Launched servers run with the answer and arXiv caches, pre-warming
+and the arXiv politeness interval switched off, so every request exercises the
+pipeline; --with-caches and --arxiv-interval restore production behaviour. Reports throughput, latency percentiles, errors by kind and the
+RSS of the gunicorn master and every worker.
+
+Usage:
+    python -m benchmarks.loadtest --workers 1,2,4 --threads 1,4 --mode open --rate 1,2,5,10
+    python -m benchmarks.loadtest --queries-file queries.log --concurrency 8 --latency groq=1.5
+    python -m benchmarks.loadtest --target http://127.0.0.1:5000 --pid 12345 --concurrency 4
+"""
+import argparse
+import json
+import os
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle
+from typing import Callable, Dict, Iterator, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from benchmarks.stub_servers import StubUpstreams, add_behaviour_arguments, parse_behaviours
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Synthetic traffic, most popular first; ranks are drawn from a Zipf distribution
+QUERY_MIX = [
+    'What is a qubit?',
+    'Explain quantum entanglement',
+    'What is superposition?',
+    'How does a quantum computer work?',
+    "How does Shor's algorithm work?",
+    "What is Grover's algorithm?",
+    'What is quantum decoherence?',
+    'How do superconducting qubits work?',
+    'What is quantum error correction?',
+    'What is quantum teleportation?',
+    'What is the Bloch sphere?',
+    'What is a quantum gate?',
+    'How does quantum key distribution work?',
+    'What is quantum supremacy?',
+    'What is the NISQ era of quantum computing?',
+    'What is a Hadamard gate?',
+    'How do trapped ion qubits work?',
+    'What is the variational quantum eigensolver?',
+    'What is the quantum approximate optimization algorithm?',
+    'What is the uncertainty principle?',
+    'What is quantum tunneling?',
+    'What is wave function collapse?',
+    "What is Schrodinger's equation?",
+    'What is a CNOT gate?',
+    'What are topological qubits?',
+    'How are photonic qubits measured?',
+    'What is quantum annealing?',
+    'What is the surface code for qubits?',
+    'What is Bell inequality violation?',
+    'What is a density matrix?'
+]
+
+
+def zipf_queries(s: float, seed: int) -> Iterator[str]:
+    rng = random.Random(seed)
+    weights = [1 / rank ** s for rank in range(1, len(QUERY_MIX) + 1)]
+    while True:
+        yield from rng.choices(QUERY_MIX, weights=weights, k=256)
+
+
+def logged_queries(path: str) -> Iterator[str]:
+    """Replay a query log in order, cycling; one query per line or JSON lines with a "query" key"""
+    queries = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            queries.append(json.loads(line)['query'] if line.startswith('{') else line)
+
+    if not queries:
+        raise SystemExit(f'No queries in {path}')
+    return cycle(queries)
+
+
+class QuerySource:
+    """Thread-safe next() over a query iterator"""
+
+    def __init__(self, queries: Iterator[str]):
+        self._queries = queries
+        self._lock = threading.Lock()
+
+    def next(self) -> str:
+        with self._lock:
+            return next(self._queries)
+
+
+class Recorder:
+    """Outcomes of requests that started after the warm-up period"""
+
+    def __init__(self, measure_from: float):
+        self.measure_from = measure_from
+        self.latencies = []
+        self.outcomes = {}
+        self._lock = threading.Lock()
+
+    def record(self, started: float, latency: float, outcome: str):
+        if started < self.measure_from:
+            return
+        with self._lock:
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+            if outcome == 'ok':
+                self.latencies.append(latency)
+
+    def summary(self, elapsed: float) -> Dict:
+        latencies = sorted(self.latencies)
+        total = sum(self.outcomes.values())
+        ok = self.outcomes.get('ok', 0)
+
+        def percentile(q: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+        return {
+            'requests': total,
+            'ok': ok,
+            'outcomes': dict(sorted(self.outcomes.items())),
+            'error_rate': (total - ok) / total if total else 0.0,
+            'throughput': ok / elapsed if elapsed > 0 else 0.0,
+            'latency': {
+                'mean': statistics.fmean(latencies) if latencies else None,
+                'p50': percentile(0.50),
+                'p90': percentile(0.90),
+                'p95': percentile(0.95),
+                'p99': percentile(0.99),
+                'max': latencies[-1] if latencies else None
+            }
+        }
+
+
+def send_query(session: requests.Session, target: str, query: str, timeout: float) -> str:
+    """POST one query; returns 'ok', the HTTP status code, 'timeout' or 'connection_error'"""
+    try:
+        response = session.post(f'{target}/api/query', json={'query': query}, timeout=timeout)
+    except requests.Timeout:
+        return 'timeout'
+    except requests.RequestException:
+        return 'connection_error'
+    return 'ok' if response.status_code == 200 else str(response.status_code)
+
+
+def run_closed_loop(target: str, source: QuerySource, concurrency: int, duration: float,
+                    warmup: float, timeout: float) -> Dict:
+    start = time.perf_counter()
+    recorder = Recorder(start + warmup)
+    deadline = start + warmup + duration
+
+    def client():
+        session = requests.Session()
+        while time.perf_counter() < deadline:
+            sent = time.perf_counter()
+            outcome = send_query(session, target, source.next(), timeout)
+            recorder.record(sent, time.perf_counter() - sent, outcome)
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Requests still in flight at the deadline finish late; count them against the full window
+    return recorder.summary(time.perf_counter() - start - warmup)
+
+
+def run_open_loop(target: str, source: QuerySource, rate: float, duration: float,
+                  warmup: float, timeout: float, max_inflight: int, seed: int) -> Dict:
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    recorder = Recorder(start + warmup)
+    deadline = start + warmup + duration
+    local = threading.local()
+
+    def fire(scheduled: float, query: str):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        outcome = send_query(local.session, target, query, timeout)
+        # From the scheduled arrival, so time spent waiting for a client thread counts too
+        recorder.record(scheduled, time.perf_counter() - scheduled, outcome)
+
+    with ThreadPoolExecutor(max_workers=max_inflight) as pool:
+        scheduled = start
+        while True:
+            scheduled += rng.expovariate(rate)
+            if scheduled >= deadline:
+                break
+            pause = scheduled - time.perf_counter()
+            if pause > 0:
+                time.sleep(pause)
+            pool.submit(fire, scheduled, source.next())
+
+    return recorder.summary(time.perf_counter() - start - warmup)
+
+
+def _rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _children(pid: int) -> List[int]:
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(entry))
+    return children
+
+
+class RSSSampler:
+    """Peak resident memory of a server process and its workers, sampled in the background"""
+
+    def __init__(self, pid: int, interval: float = 1.0):
+        self.pid = pid
+        self.interval = interval
+        self.peak = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self) -> Dict:
+        self._stop.set()
+        self._thread.join()
+        return self.report()
+
+    def sample(self):
+        for pid in [self.pid] + _children(self.pid):
+            rss = _rss_mb(pid)
+            if rss is not None:
+                self.peak[pid] = max(rss, self.peak.get(pid, 0.0))
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.sample()
+            self._stop.wait(self.interval)
+
+    def report(self) -> Dict:
+        workers = [round(rss, 1) for pid, rss in sorted(self.peak.items()) if pid != self.pid]
+        master = self.peak.get(self.pid)
+        return {
+            'master_mb': round(master, 1) if master is not None else None,
+            'workers_mb': workers,
+            'per_worker_mb': round(statistics.fmean(workers), 1) if workers else None,
+            'total_mb': round(sum(self.peak.values()), 1)
+        }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class AppServer:
+    """gunicorn serving app:app with its upstreams pointed at the stubs"""
+
+    def __init__(self, workers: int, threads: int, env: Dict[str, str], preload: bool = False,
+                 startup_timeout: float = 300.0):
+        self.port = _free_port()
+        self.url = f'http://127.0.0.1:{self.port}'
+        self.startup_timeout = startup_timeout
+
+        command = [sys.executable, '-m', 'gunicorn', 'app:app',
+                   '--bind', f'127.0.0.1:{self.port}',
+                   '--workers', str(workers), '--threads', str(threads), '--timeout', '120']
+        if preload:
+            command.append('--preload')
+
+        self.process = subprocess.Popen(command, cwd=REPO_ROOT, env={**os.environ, 'LOG_LEVEL': 'WARNING', **env})
+        self.startup_seconds = self._wait_ready()
+
+    def _wait_ready(self) -> float:
+        start = time.perf_counter()
+        while time.perf_counter() - start < self.startup_timeout:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'gunicorn exited with status {self.process.returncode}')
+            try:
+                if requests.get(f'{self.url}/api/health', timeout=2).ok:
+                    return time.perf_counter() - start
+            except requests.RequestException:
+                pass
+            time.sleep(0.5)
+
+        self.stop()
+        raise RuntimeError(f'gunicorn not ready after {self.startup_timeout}s')
+
+    def stop(self):
+        if self.process.poll() is None:
+            self.process.send_signal(signal.SIGTERM)
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+
+def build_knowledge_base():
+    """Embed the knowledge base up front, as a deploy would, so no worker embeds it at startup"""
+    print('📚 Building knowledge base embeddings...', file=sys.stderr)
+    subprocess.run([sys.executable, os.path.join('scripts', 'build_knowledge_base.py')], cwd=REPO_ROOT, check=True)
+
+
+def app_env(upstream_env: Dict[str, str], state_dir: str, with_caches: bool, arxiv_interval: float) -> Dict[str, str]:
+    """Environment for the launched app: stub upstreams, private state files and, unless
+    with_caches, no answer/arXiv caching or pre-warming to short-circuit the pipeline"""
+    env = {
+        **upstream_env,
+        'ARXIV_MIN_INTERVAL': str(arxiv_interval),
+        'ARXIV_SCHEDULE_FILE': os.path.join(state_dir, 'arxiv.schedule'),
+        'PREWARM_STATE_FILE': os.path.join(state_dir, 'prewarm.json')
+    }
+    if not with_caches:
+        env.update({'ANSWER_CACHE_SIZE': '0', 'ARXIV_CACHE_SIZE': '0', 'PREWARM_ENABLED': '0'})
+    return env
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(',')]
+
+
+def _float_list(value: str) -> List[float]:
+    return [float(item) for item in value.split(',')]
+
+
+def run_levels(target: str, args, pid: Optional[int], new_source: Callable[[], QuerySource]) -> List[Dict]:
+    """Run every load level against one server"""
+    levels = args.concurrency if args.mode == 'closed' else args.rate
+    runs = []
+    for level in levels:
+        sampler = RSSSampler(pid).start() if pid else None
+        source = new_source()
+
+        print(f'🚦 {args.mode} loop, {"concurrency" if args.mode == "closed" else "rate"} {level}...', file=sys.stderr)
+        if args.mode == 'closed':
+            summary = run_closed_loop(target, source, int(level), args.duration, args.warmup, args.timeout)
+        else:
+            summary = run_open_loop(target, source, level, args.duration, args.warmup, args.timeout,
+                                    args.max_inflight, args.seed)
+
+        summary['mode'] = args.mode
+        summary['load'] = level
+        if sampler:
+            summary['rss'] = sampler.stop()
+        runs.append(summary)
+    return runs
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Load-test the app against stub upstreams')
+    parser.add_argument('--target', help='URL of an already running server (skips launching gunicorn)')
+    parser.add_argument('--pid', type=int, help='with --target: server master pid, for RSS sampling')
+    parser.add_argument('--workers', type=_int_list, default=[1], help='gunicorn worker counts, e.g. 1,2,4')
+    parser.add_argument('--threads', type=_int_list, default=[1], help='gunicorn threads per worker, e.g. 1,4')
+    parser.add_argument('--preload', action='store_true', help='load the app in the gunicorn master')
+    parser.add_argument('--startup-timeout', type=float, default=300.0)
+    parser.add_argument('--with-caches', action='store_true',
+                        help='keep the answer/arXiv caches and pre-warming on (most requests then skip the pipeline)')
+    parser.add_argument('--arxiv-interval', type=float, default=0.0,
+                        help='host-wide seconds between arXiv calls (production default: 3)')
+    parser.add_argument('--mode', choices=('closed', 'open'), default='closed')
+    parser.add_argument('--concurrency', type=_int_list, default=[4], help='closed loop: concurrent clients')
+    parser.add_argument('--rate', type=_float_list, default=[2.0], help='open loop: arrivals per second')
+    parser.add_argument('--max-inflight', type=int, default=512, help='open loop: client thread cap')
+    parser.add_argument('--duration', type=float, default=60.0, help='measured seconds per load level')
+    parser.add_argument('--warmup', type=float, default=10.0, help='unmeasured seconds before each level')
+    parser.add_argument('--timeout', type=float, default=60.0, help='client timeout per request')
+    parser.add_argument('--queries-file', help='query log to replay (default: Zipf mix of QUERY_MIX)')
+    parser.add_argument('--zipf-s', type=float, default=1.1, help='Zipf exponent of the synthetic mix')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results as JSON to this file')
+    add_behaviour_arguments(parser)
+    args = parser.parse_args(argv)
+
+    def new_source() -> QuerySource:
+        if args.queries_file:
+            return QuerySource(logged_queries(args.queries_file))
+        return QuerySource(zipf_queries(args.zipf_s, args.seed))
+
+    behaviours = parse_behaviours(args.latency, args.error_rate, args.jitter, args.chunk_interval)
+    results = []
+    upstream_stats = None
+
+    if args.target:
+        # The target is wired to its own upstreams (e.g. `python -m benchmarks.stub_servers`)
+        for run in run_levels(args.target.rstrip('/'), args, args.pid, new_source):
+            results.append({'workers': None, 'threads': None, **run})
+    else:
+        build_knowledge_base()
+        with StubUpstreams(behaviours) as upstreams, tempfile.TemporaryDirectory() as state_dir:
+            env = app_env(upstreams.env(), state_dir, args.with_caches, args.arxiv_interval)
+            for workers in args.workers:
+                for threads in args.threads:
+                    print(f'🚀 gunicorn --workers {workers} --threads {threads}', file=sys.stderr)
+                    server = AppServer(workers, threads, env, args.preload, args.startup_timeout)
+                    try:
+                        for run in run_levels(server.url, args, server.process.pid, new_source):
+                            results.append({'workers': workers, 'threads': threads,
+                                            'startup_seconds': round(server.startup_seconds, 2), **run})
+                    finally:
+                        server.stop()
+
+            upstream_stats = upstreams.stats()
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'mode': args.mode,
+            'duration': args.duration,
+            'warmup': args.warmup,
+            'queries': args.queries_file or f'zipf(s={args.zipf_s})',
+            'preload': args.preload,
+            'with_caches': args.with_caches,
+            'arxiv_interval': args.arxiv_interval,
+            'upstreams': None if args.target else {name: vars(behaviour) for name, behaviour in behaviours.items()}
+        },
+        'runs': results,
+        'upstream_requests': upstream_stats
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    print_summary(report)
+    return 0
+
+
+def print_summary(report: Dict):
+    def ms(value: Optional[float]) -> str:
+        return f'{value * 1000:.0f}' if value is not None else '-'
+
+    print(f"{'workers':>7} {'threads':>7} {'load':>6} {'req/s':>8} {'p50ms':>7} {'p95ms':>7} {'p99ms':>7} "
+          f"{'errors':>7} {'worker MB':>10} {'total MB':>9}")
+    for run in report['runs']:
+        rss = run.get('rss') or {}
+        latency = run['latency']
+        print(f"{run['workers'] or '-':>7} {run['threads'] or '-':>7} {run['load']:>6} {run['throughput']:8.2f} "
+              f"{ms(latency['p50']):>7} {ms(latency['p95']):>7} {ms(latency['p99']):>7} "
+              f"{run['error_rate']:7.1%} {rss.get('per_worker_mb') or '-':>10} {rss.get('total_mb') or '-':>9}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,427 @@
+"""Offline benchmark suite for the RAG pipeline's hot paths.
+
+Every upstream is served from benchmarks/fixtures (see benchmarks/fakes.py), so
+no network is needed. The embedding model is loaded from the local Hugging Face
+cache; pass --embedder hash to use a deterministic stand-in instead.
+
+Usage:
+    python -m benchmarks.run [--quick] [--embedder auto|model|hash] [--only PREFIX ...]
+                             [--output results.json] [--baseline baseline.json] [--tolerance 0.2]
+
+With --baseline the run exits non-zero when any benchmark's median is more than
+--tolerance slower than in the baseline file (a previous --output).
+
+Benchmarks that allocate per document also report a 'memory' entry from one
+extra call under tracemalloc: the peak traced bytes during the call and the
+bytes and blocks still held by its result.
+"""
+import argparse
+import gc
+import json
+import logging
+import math
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Never reach for the Hugging Face hub; the model must already be cached
+os.environ.setdefault('HF_HUB_OFFLINE', '1')
+os.environ.setdefault('TRANSFORMERS_OFFLINE', '1')
+
+import numpy as np
+
+from config import Config
+from benchmarks.fakes import FakeGroq, HashEmbedder, load_fixture, offline
+from src import rag_engine as rag_engine_module
+from src.answer_cache import AnswerCache
+from src.arxiv_search import ArxivSearcher
+from src.document import Document
+from src.google_search import GoogleSearcher
+from src.knowledge_base import KnowledgeBase
+from src.pipeline import QueryPipeline
+from src.politeness import PolitenessScheduler
+from src.query_processor import QueryProcessor
+from src.serpapi_search import SerpAPISearcher
+from src.web_scraper import WebScraper
+
+ENCODE_BATCH_SIZES = (8, 32, 128, 256)
+ENCODE_CORPUS_SIZE = 512
+CORPUS_SIZES = (10, 1_000, 100_000, 1_000_000)
+DOCUMENT_COUNTS = (100, 10_000)
+QUICK_MAX_CORPUS = 100_000
+QUERIES = [
+    'What is a qubit?',
+    'How does quantum entanglement work?',
+    "Explain Shor's algorithm",
+    'superconducting qubit decoherence'
+]
+
+
+def measure(fn: Callable[[], object], repeat: int, warmup: int = 1, items: int = None,
+            memory: bool = False) -> Dict:
+    """Time fn() repeat times after warmup calls; all durations in seconds"""
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+
+    samples.sort()
+    median = statistics.median(samples)
+    stats = {
+        'repeat': repeat,
+        'min': samples[0],
+        'median': median,
+        'mean': statistics.fmean(samples),
+        'p95': samples[max(0, math.ceil(0.95 * len(samples)) - 1)],
+        'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0
+    }
+    if items:
+        stats['items'] = items
+        stats['items_per_sec'] = items / median if median > 0 else float('inf')
+    if memory:
+        stats['memory'] = measure_memory(fn, items)
+    return stats
+
+
+def measure_memory(fn: Callable[[], object], items: int = None) -> Dict:
+    """Allocations of one fn() call: peak traced bytes while it ran, and bytes/blocks its result still holds"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        start_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+
+        result = fn()
+
+        end_bytes, peak_bytes = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+    del result
+
+    stats = {
+        'peak_bytes': peak_bytes - start_bytes,
+        'retained_bytes': end_bytes - start_bytes,
+        'retained_blocks': blocks
+    }
+    if items:
+        stats['retained_bytes_per_item'] = stats['retained_bytes'] / items
+    return stats
+
+
+class SyntheticEntries:
+    """Index entries for a synthetic corpus, materialised only when retrieved"""
+
+    def __init__(self, size: int):
+        self.size = size
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, idx) -> Document:
+        idx = int(idx)
+        return Document(f'Synthetic document {idx}', '', '', source='Synthetic', origin='Synthetic')
+
+
+def random_unit_vectors(count: int, dimension: int, seed: int = 0) -> np.ndarray:
+    """L2-normalised float32 rows, normalised in chunks to bound peak memory"""
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((count, dimension), dtype=np.float32)
+    for start in range(0, count, 65536):
+        chunk = vectors[start:start + 65536]
+        chunk /= np.linalg.norm(chunk, axis=1, keepdims=True)
+    return vectors
+
+
+def make_arxiv_searcher(schedule_file: str = os.devnull) -> ArxivSearcher:
+    """arXiv searcher with no politeness delay and no page cache hiding the parse work"""
+    searcher = ArxivSearcher(scheduler=PolitenessScheduler(
+        schedule_file, min_interval=0, max_wait=Config.ARXIV_MAX_SCHEDULE_WAIT))
+    searcher.page_cache = AnswerCache(0, 0)
+    return searcher
+
+
+def synthetic_results(count: int) -> List[Dict]:
+    """Raw search results (as decoded from an upstream's JSON) cycled from the SerpAPI fixture"""
+    organic = json.loads(load_fixture('serpapi.json'))['organic_results']
+    return [
+        {
+            'title': f"{organic[i % len(organic)]['title']} ({i})",
+            'snippet': organic[i % len(organic)]['snippet'] * 4,
+            'link': f"{organic[i % len(organic)]['link']}#{i}"
+        }
+        for i in range(count)
+    ]
+
+
+def synthetic_documents(count: int) -> List[Document]:
+    """Documents with realistic titles and snippets, cycled from the arXiv fixture"""
+    papers = make_arxiv_searcher()._parse_arxiv_response(load_fixture('arxiv_query.xml'))
+    return [
+        Document(
+            f'{papers[i % len(papers)].title} ({i})',
+            papers[i % len(papers)].snippet,
+            f'{papers[i % len(papers)].link}#{i}',
+            source='arXiv',
+            origin='arXiv'
+        )
+        for i in range(count)
+    ]
+
+
+def make_engine(embedder: str):
+    """RAGEngine with the fake Groq client; returns (engine, embedder actually used)"""
+    if embedder in ('auto', 'model'):
+        try:
+            engine = rag_engine_module.RAGEngine(groq_api_key='')
+            used = Config.EMBEDDING_MODEL
+        except Exception as e:
+            if embedder == 'model':
+                raise
+            logging.warning('Embedding model unavailable offline (%s); using the hash embedder', e)
+            embedder = 'hash'
+
+    if embedder == 'hash':
+        with mock.patch.object(rag_engine_module, 'SentenceTransformer', lambda name: HashEmbedder()):
+            engine = rag_engine_module.RAGEngine(groq_api_key='')
+        used = 'hash'
+
+    engine.groq_client = FakeGroq()
+    engine.llm_available = True
+    engine.model_name = 'fake-groq'
+    return engine, used
+
+
+def make_pipeline(engine, schedule_file: str) -> QueryPipeline:
+    """A pipeline wired like app.py, minus caches that would hide the work being measured"""
+    return QueryPipeline(
+        arxiv_searcher=make_arxiv_searcher(schedule_file),
+        serpapi_searcher=SerpAPISearcher(api_key='offline'),
+        google_searcher=GoogleSearcher(api_key='offline', cse_id='offline'),
+        web_scraper=WebScraper(knowledge_base=KnowledgeBase(encoder=engine.encode, persist=False)),
+        query_processor=QueryProcessor(encoder=engine.encode),
+        rag_engine=engine
+    )
+
+
+def bench_parse_arxiv(quick: bool) -> Dict[str, Dict]:
+    searcher = make_arxiv_searcher()
+    xml_text = load_fixture('arxiv_query.xml')
+
+    # A 100-entry feed built by repeating the recorded entries
+    head, rest = xml_text.split('<entry>', 1)
+    body, tail = rest.rsplit('</entry>', 1)
+    entries = ('<entry>' + body + '</entry>').split('</entry>')[:-1]
+    large_xml = head + ''.join(entries[i % len(entries)] + '</entry>' for i in range(100)) + tail
+
+    repeat = 20 if quick else 200
+    return {
+        f'parse_arxiv[entries={len(entries)}]': measure(
+            lambda: searcher._parse_arxiv_response(xml_text), repeat, items=len(entries), memory=True),
+        'parse_arxiv[entries=100]': measure(
+            lambda: searcher._parse_arxiv_response(large_xml), repeat // 4, items=100, memory=True)
+    }
+
+
+def legacy_documents(raw: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """What the same results cost as dicts, exactly as the baseline built them: the searcher's
+    dict, the pipeline's copy and the index entry with its nested metadata"""
+    searched = [{'title': r['title'], 'snippet': r['snippet'], 'link': r['link'], 'source': 'SerpAPI',
+                 'position': position} for position, r in enumerate(raw, 1)]
+    documents = [{'title': r['title'], 'snippet': r['snippet'][:Config.SNIPPET_MAX_CHARS], 'link': r['link'],
+                  'source_type': r.get('source', 'Web')}
+                 for r in searched]
+    entries = [{'id': i, 'text': f"{doc['title']}. {doc['snippet']}",
+                'metadata': {'title': doc['title'], 'link': doc['link'],
+                             'source': doc.get('source_type', doc.get('source', 'Unknown'))}}
+               for i, doc in enumerate(documents)]
+    return documents, entries
+
+
+def bench_build_documents(quick: bool) -> Dict[str, Dict]:
+    """Turning decoded upstream results into Documents, and what each one keeps alive,
+    next to the dict-based baseline for the same results"""
+    results = {}
+    for count in DOCUMENT_COUNTS:
+        raw = synthetic_results(count)
+        results[f'build_documents[n={count}]'] = measure(
+            lambda: [Document(r['title'], r['snippet'], r['link'], source='SerpAPI', origin='SerpAPI') for r in raw],
+            5 if quick else 20, items=count, memory=True)
+        results[f'build_documents_dicts[n={count}]'] = measure(
+            lambda: legacy_documents(raw), 5 if quick else 20, items=count, memory=True)
+    return results
+
+
+def bench_encode(engine, quick: bool) -> Dict[str, Dict]:
+    documents = synthetic_documents(ENCODE_CORPUS_SIZE)
+    results = {}
+    for batch_size in ENCODE_BATCH_SIZES:
+        with mock.patch.object(Config, 'EMBEDDING_BATCH_SIZE', batch_size):
+            results[f'add_documents[batch_size={batch_size}]'] = measure(
+                lambda: engine.add_documents(documents), 2 if quick else 5, items=len(documents))
+    engine.reset()
+    return results
+
+
+def bench_retrieve(engine, quick: bool, max_corpus: int) -> Dict[str, Dict]:
+    dimension = engine.embedder.get_sentence_embedding_dimension()
+    results = {}
+    for size in CORPUS_SIZES:
+        if size > max_corpus:
+            continue
+
+        engine.documents = SyntheticEntries(size)
+        engine.embeddings = random_unit_vectors(size, dimension)
+        repeat = 5 if quick else (20 if size >= 100_000 else 100)
+        results[f'retrieve[n={size}]'] = measure(
+            lambda: engine.retrieve(QUERIES[0], top_k=Config.RETRIEVAL_TOP_K), repeat)
+
+    engine.reset()
+    return results
+
+
+def bench_parse_llm_answer(engine, quick: bool) -> Dict[str, Dict]:
+    answer_text = load_fixture('llm_answer.txt')
+    sources = [{'title': f'Source {i}', 'link': f'https://example.org/{i}', 'type': 'arXiv'} for i in range(6)]
+    return {
+        'parse_llm_answer': measure(
+            lambda: engine._parse_llm_answer(answer_text, sources), 100 if quick else 1000)
+    }
+
+
+def bench_process_query(engine, quick: bool) -> Dict[str, Dict]:
+    with tempfile.TemporaryDirectory() as tmp, offline():
+        pipeline = make_pipeline(engine, os.path.join(tmp, 'arxiv.schedule'))
+
+        for query in QUERIES:
+            response = pipeline.answer(query)
+            if 'error' in response:
+                raise RuntimeError(f'Benchmark query rejected: {query!r}: {response["error"]}')
+
+        def run_all():
+            for query in QUERIES:
+                pipeline.answer(query)
+
+        stats = measure(run_all, 3 if quick else 10, items=len(QUERIES), memory=True)
+        stats['per_query'] = stats['median'] / len(QUERIES)
+        return {'process_query': stats}
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[Dict]:
+    """Median-to-median comparison; a ratio above 1 + tolerance is a regression"""
+    rows = []
+    for name, stats in results.items():
+        before = baseline.get(name)
+        if before is None:
+            rows.append({'name': name, 'status': 'new', 'median': stats['median']})
+            continue
+
+        ratio = stats['median'] / before['median'] if before['median'] > 0 else float('inf')
+        if ratio > 1 + tolerance:
+            status = 'regression'
+        elif ratio < 1 - tolerance:
+            status = 'improved'
+        else:
+            status = 'ok'
+        rows.append({'name': name, 'status': status, 'median': stats['median'],
+                     'baseline_median': before['median'], 'ratio': ratio})
+    return rows
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description='Run the offline benchmark suite')
+    parser.add_argument('--quick', action='store_true', help='fewer repeats, corpora up to 100k')
+    parser.add_argument('--embedder', choices=('auto', 'model', 'hash'), default='auto')
+    parser.add_argument('--max-corpus', type=int, default=None, help='largest retrieve() corpus to build')
+    parser.add_argument('--only', nargs='*', default=None, help='run benchmarks whose name starts with these')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results from a previous run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed median slowdown (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format='%(levelname)s %(name)s: %(message)s')
+    max_corpus = args.max_corpus or (QUICK_MAX_CORPUS if args.quick else CORPUS_SIZES[-1])
+
+    engine, embedder = make_engine(args.embedder)
+    suites = [
+        ('parse_arxiv', lambda: bench_parse_arxiv(args.quick)),
+        ('build_documents', lambda: bench_build_documents(args.quick)),
+        ('add_documents', lambda: bench_encode(engine, args.quick)),
+        ('retrieve', lambda: bench_retrieve(engine, args.quick, max_corpus)),
+        ('parse_llm_answer', lambda: bench_parse_llm_answer(engine, args.quick)),
+        ('process_query', lambda: bench_process_query(engine, args.quick))
+    ]
+
+    results = {}
+    for name, suite in suites:
+        if args.only and not any(name.startswith(prefix) for prefix in args.only):
+            continue
+        print(f'⏱  {name}...', file=sys.stderr)
+        results.update(suite())
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'embedder': embedder,
+            'quick': args.quick
+        },
+        'results': results
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline['meta'].get('embedder') != embedder:
+            print(f"⚠ Baseline used embedder {baseline['meta'].get('embedder')!r}, this run {embedder!r}",
+                  file=sys.stderr)
+
+        report['comparison'] = compare(results, baseline['results'], args.tolerance)
+        if any(row['status'] == 'regression' for row in report['comparison']):
+            exit_code = 1
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    print_summary(report)
+    return exit_code
+
+
+def print_summary(report: Dict):
+    comparison = {row['name']: row for row in report.get('comparison', [])}
+    print(f"{'benchmark':40} {'median':>12} {'p95':>12} {'items/s':>12} {'peak KiB':>10} {'kept KiB':>10}  vs baseline")
+    for name, stats in report['results'].items():
+        row = comparison.get(name)
+        versus = ''
+        if row and 'ratio' in row:
+            versus = f"{row['ratio']:.2f}x {row['status']}"
+        elif row:
+            versus = row['status']
+        items = f"{stats['items_per_sec']:.1f}" if 'items_per_sec' in stats else ''
+        peak = f"{stats['memory']['peak_bytes'] / 1024:.1f}" if 'memory' in stats else ''
+        kept = f"{stats['memory']['retained_bytes'] / 1024:.1f}" if 'memory' in stats else ''
+        print(f"{name:40} {stats['median'] * 1000:10.3f}ms {stats['p95'] * 1000:10.3f}ms {items:>12} {peak:>10} "
+              f"{kept:>10}  {versus}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
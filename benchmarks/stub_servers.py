@@ -0,0 +1,260 @@
+"""Local HTTP stubs standing in for arXiv, Wikipedia, SerpAPI and Groq.
+
+Each upstream runs its own ThreadingHTTPServer on 127.0.0.1 and answers from
+the recorded fixtures, with injectable latency and error rates so load tests can
+reproduce slow or flaky upstreams. `StubUpstreams.env()` gives the environment
+variables that point the app at them.
+
+Serve them for a manually started app:
+    python -m benchmarks.stub_servers --latency groq=1.5 --error-rate serpapi=0.05
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import load_fixture
+
+UPSTREAMS = ('arxiv', 'wikipedia', 'serpapi', 'groq')
+
+
+class UpstreamBehaviour:
+    """Latency and failure injection for one stub upstream"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.5, error_rate: float = 0.0,
+                 chunk_interval: float = 0.0):
+        self.latency = latency  # mean seconds before the first byte
+        self.jitter = jitter  # latency is uniform in latency * (1 +/- jitter)
+        self.error_rate = error_rate  # fraction of requests answered with a 503
+        self.chunk_interval = chunk_interval  # seconds between streamed LLM chunks
+
+    def delay(self) -> float:
+        if self.latency <= 0:
+            return 0.0
+        return random.uniform(self.latency * (1 - self.jitter), self.latency * (1 + self.jitter))
+
+    def should_fail(self) -> bool:
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.stub.handle(self)
+
+    def do_POST(self):
+        self.server.stub.handle(self)
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status: int, content_type: str, body: str):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class StubServer:
+    """One upstream served from fixtures on an ephemeral local port"""
+
+    def __init__(self, name: str, behaviour: UpstreamBehaviour = None):
+        self.name = name
+        self.behaviour = behaviour or UpstreamBehaviour()
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+        self._arxiv = load_fixture('arxiv_query.xml')
+        self._opensearch = load_fixture('wikipedia_opensearch.json')
+        self._extracts = load_fixture('wikipedia_extracts.json')
+        self._serpapi = load_fixture('serpapi.json')
+        self._answer = load_fixture('llm_answer.txt')
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name=f'stub-{name}', daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'requests': self.requests, 'errors': self.errors}
+
+    def handle(self, handler: _StubHandler):
+        length = int(handler.headers.get('Content-Length') or 0)
+        body = handler.rfile.read(length) if length else b''
+
+        fail = self.behaviour.should_fail()
+        with self._lock:
+            self.requests += 1
+            self.errors += fail
+
+        delay = self.behaviour.delay()
+        if delay:
+            time.sleep(delay)
+
+        if fail:
+            handler.send_body(503, 'application/json', json.dumps({'error': 'injected failure'}))
+            return
+
+        if self.name == 'groq':
+            self._chat_completion(handler, json.loads(body or b'{}'))
+            return
+
+        params = parse_qs(urlparse(handler.path).query)
+        if self.name == 'arxiv':
+            handler.send_body(200, 'application/atom+xml', self._arxiv)
+        elif self.name == 'wikipedia':
+            payload = self._opensearch if params.get('action') == ['opensearch'] else self._extracts
+            handler.send_body(200, 'application/json', payload)
+        else:
+            handler.send_body(200, 'application/json', self._serpapi)
+
+    def _chat_completion(self, handler: _StubHandler, request: Dict):
+        """OpenAI-compatible /openai/v1/chat/completions, streamed as server-sent events on request"""
+        model = request.get('model', 'stub')
+        created = int(time.time())
+
+        if not request.get('stream'):
+            handler.send_body(200, 'application/json', json.dumps({
+                'id': 'chatcmpl-stub', 'object': 'chat.completion', 'created': created, 'model': model,
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': self._answer}}]
+            }))
+            return
+
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'text/event-stream')
+        handler.send_header('Connection', 'close')
+        handler.end_headers()
+        handler.close_connection = True
+
+        for piece, finish_reason in self._answer_chunks():
+            chunk = {
+                'id': 'chatcmpl-stub', 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+                'choices': [{'index': 0, 'finish_reason': finish_reason,
+                             'delta': {'content': piece} if piece else {}}]
+            }
+            handler.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode('utf-8'))
+            handler.wfile.flush()
+            if self.behaviour.chunk_interval:
+                time.sleep(self.behaviour.chunk_interval)
+
+        handler.wfile.write(b'data: [DONE]\n\n')
+        handler.wfile.flush()
+
+    def _answer_chunks(self):
+        words = re.findall(r'\S+\s*', self._answer)
+        for i in range(0, len(words), 3):
+            yield ''.join(words[i:i + 3]), None
+        yield None, 'stop'
+
+
+class StubUpstreams:
+    """All four stub upstreams, started and stopped together"""
+
+    def __init__(self, behaviours: Dict[str, UpstreamBehaviour] = None):
+        behaviours = behaviours or {}
+        self.servers = {name: StubServer(name, behaviours.get(name)) for name in UPSTREAMS}
+
+    def start(self):
+        for server in self.servers.values():
+            server.start()
+        return self
+
+    def stop(self):
+        for server in self.servers.values():
+            server.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def env(self) -> Dict[str, str]:
+        """Environment for the app under test; Google CSE is left unconfigured"""
+        return {
+            'ARXIV_API_URL': self.servers['arxiv'].url + '/api/query',
+            'WIKIPEDIA_API_URL': self.servers['wikipedia'].url + '/w/api.php',
+            'SERPAPI_URL': self.servers['serpapi'].url + '/search',
+            'SERPAPI_KEY': 'stub',
+            'GROQ_BASE_URL': self.servers['groq'].url,
+            'GROQ_API_KEY': 'stub',
+            'GOOGLE_API_KEY': '',
+            'GOOGLE_CSE_ID': ''
+        }
+
+    def stats(self) -> Dict[str, Dict]:
+        return {name: server.stats() for name, server in self.servers.items()}
+
+
+def parse_behaviours(latency: List[str], error_rate: List[str], jitter: float,
+                     chunk_interval: float) -> Dict[str, UpstreamBehaviour]:
+    """Build behaviours from NAME=VALUE options, e.g. --latency groq=1.5 --error-rate serpapi=0.05"""
+    behaviours = {name: UpstreamBehaviour(jitter=jitter) for name in UPSTREAMS}
+    behaviours['groq'].chunk_interval = chunk_interval
+
+    for options, attribute in ((latency, 'latency'), (error_rate, 'error_rate')):
+        for option in options or []:
+            name, _, value = option.partition('=')
+            if name not in behaviours:
+                raise ValueError(f'Unknown upstream {name!r}; expected one of {", ".join(UPSTREAMS)}')
+            setattr(behaviours[name], attribute, float(value))
+
+    return behaviours
+
+
+def add_behaviour_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--latency', action='append', metavar='UPSTREAM=SECONDS',
+                        help=f'mean stub latency ({", ".join(UPSTREAMS)})')
+    parser.add_argument('--error-rate', action='append', metavar='UPSTREAM=FRACTION',
+                        help='fraction of stub responses that are 503s')
+    parser.add_argument('--jitter', type=float, default=0.5, help='latency spread as a fraction of the mean')
+    parser.add_argument('--chunk-interval', type=float, default=0.0,
+                        help='seconds between streamed Groq chunks')
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description='Serve stub upstreams until interrupted')
+    add_behaviour_arguments(parser)
+    args = parser.parse_args(argv)
+
+    behaviours = parse_behaviours(args.latency, args.error_rate, args.jitter, args.chunk_interval)
+    with StubUpstreams(behaviours) as upstreams:
+        for key, value in upstreams.env().items():
+            print(f"export {key}='{value}'")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            print(json.dumps(upstreams.stats()), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 
 class Config:
@@ -8,8 +9,31 @@ class Config:
     GOOGLE_CSE_ID = os.getenv('GOOGLE_CSE_ID')
     GROQ_API_KEY = os.getenv('GROQ_API_KEY')
 
+    # Upstream endpoints (overridable so load tests can point them at local stubs)
+    SERPAPI_URL = os.getenv('SERPAPI_URL', 'https://serpapi.com/search')
+    WIKIPEDIA_API_URL = os.getenv('WIKIPEDIA_API_URL', 'https://en.wikipedia.org/w/api.php')
+    GROQ_BASE_URL = os.getenv('GROQ_BASE_URL')  # None uses the Groq SDK default
+
+    # Logging (override with the LOG_LEVEL environment variable)
+    LOG_LEVEL = 'INFO'
+
+    # Request Profiling (opt-in; see src/profiling.py)
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+    PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')  # X-Profile header value that forces a profile
+
     # arXiv Configuration
-    ARXIV_MAX_RESULTS = 5
+    ARXIV_API_URL = os.getenv('ARXIV_API_URL', 'http://export.arxiv.org/api/query')
+    ARXIV_MAX_RESULTS = 5  # page size; deeper pages are fetched on demand
+    ARXIV_MAX_DEPTH = 20
+    ARXIV_MIN_INTERVAL = float(os.getenv('ARXIV_MIN_INTERVAL', '3.0'))  # seconds between requests from this host
+    ARXIV_MAX_SCHEDULE_WAIT = 6.0  # interactive requests skip arXiv rather than queue longer
+    ARXIV_BACKGROUND_MAX_SCHEDULE_WAIT = 120.0  # batch and pre-warm requests queue this long for a slot
+    ARXIV_PAGING_BUDGET = 4.0  # seconds per request for deeper arXiv pages, politeness waits included
+    ARXIV_SCHEDULE_FILE = os.getenv(
+        'ARXIV_SCHEDULE_FILE', os.path.join(tempfile.gettempdir(), 'quantum-chatbot-arxiv.schedule'))
+    ARXIV_CACHE_SIZE = int(os.getenv('ARXIV_CACHE_SIZE', '512'))
+    ARXIV_CACHE_TTL = 3600
     ARXIV_CATEGORIES = [
         'quant-ph',  # Quantum Physics
         'cond-mat.mes-hall',  # Mesoscale and Nanoscale Physics
@@ -24,14 +48,113 @@ class Config:
         'google': 0.25
     }
 
-    # Quantum Keywords
+    # Retrieval Configuration
+    EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
+    RETRIEVAL_TOP_K = 8
+    SNIPPET_MAX_CHARS = 700
+    RETRIEVAL_MIN_SIMILARITY = 0.35  # a candidate below this is not considered relevant
+    RETRIEVAL_MIN_RELEVANT = 4  # page deeper into arXiv while fewer candidates are relevant
+    EMBEDDING_BATCH_SIZE = 256
+
+    # Offline Knowledge Base
+    KNOWLEDGE_BASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'knowledge_base.json')
+    KNOWLEDGE_BASE_TOP_K = 3
+    KNOWLEDGE_BASE_MIN_SIMILARITY = 0.3
+
+    # Batch Configuration
+    BATCH_MAX_QUERIES = 500
+    BATCH_FETCH_CONCURRENCY = 8
+    BATCH_LLM_CONCURRENCY = 4
+
+    # Admission Control
+    PIPELINE_MAX_CONCURRENT = 8
+    PIPELINE_MAX_QUEUE = 32
+    PIPELINE_QUEUE_TIMEOUT = 15.0
+    LLM_MAX_CONCURRENT = 4
+    LLM_MAX_QUEUE = 64
+    LLM_QUEUE_TIMEOUT = 30.0
+
+    # Answer Cache
+    ANSWER_CACHE_SIZE = int(os.getenv('ANSWER_CACHE_SIZE', '1024'))
+    ANSWER_CACHE_TTL = float(os.getenv('ANSWER_CACHE_TTL', '3600'))
+
+    # Conversation Sessions
+    SESSION_MAX_SESSIONS = 500
+    SESSION_TTL = 1800  # seconds a session may sit idle
+    SESSION_MAX_DOCUMENTS = 100  # retrieved documents (and embeddings) kept per session
+    SESSION_MAX_TURNS = 20
+    SESSION_MIN_RELEVANT = 3  # session documents above RETRIEVAL_MIN_SIMILARITY needed to skip upstream
+    SESSION_FOLLOW_UP_MIN_RELEVANT = 2  # ...needed to accept a follow-up the topic gate rejects on its own
+    SESSION_HISTORY_TOKEN_BUDGET = 600  # conversation history sent to the LLM
+
+    # Pre-warming of popular queries (see src/prewarm.py)
+    PREWARM_ENABLED = os.getenv('PREWARM_ENABLED', '1').lower() not in ('0', 'false', 'no')
+    PREWARM_TOP_N = 20
+    PREWARM_MIN_ASKS = 3  # asks within the window before a query is kept warm
+    PREWARM_WINDOW = 24 * 3600  # seconds of query history that count
+    PREWARM_HISTORY_SIZE = 50000  # most asks remembered
+    PREWARM_INTERVAL = 60  # seconds between rounds
+    PREWARM_REFRESH_BEFORE = 300  # refresh answers expiring within this many seconds
+    PREWARM_CONCURRENCY = 2
+    PREWARM_QUIET_HOURS = (1, 6)  # local [start, end) hours with reduced pre-warming
+    PREWARM_QUIET_TOP_N = 3
+    PREWARM_STATE_FILE = os.getenv(
+        'PREWARM_STATE_FILE', os.path.join(tempfile.gettempdir(), 'quantum-chatbot-prewarm.json'))
+    PREWARM_SEED_QUERIES = [  # warmed on a fresh deploy before any traffic is seen
+        'What is a qubit?',
+        'Explain entanglement',
+        'What is superposition?'
+    ]
+
+    # Adaptive Source Selection
+    SOURCE_SELECTION_ENABLED = True
+    SOURCE_EXPLORATION_RATE = 0.1
+    SOURCE_MIN_SAMPLES = 20
+    SOURCE_MIN_UTILITY = 0.05
+    SOURCE_LATENCY_WEIGHT = 0.02  # utility given up per second of p90 latency
+    SOURCE_STATS_WINDOW = 200
+    SOURCE_COSTS = {  # utility given up per call (paid APIs)
+        'arXiv': 0.0,
+        'SerpAPI': 0.02,
+        'Google': 0.02,
+        'Web': 0.0
+    }
+
+    # Quantum Keywords (unambiguous: a match accepts the query outright).
+    # Matched as whole words; plural and inflected endings (s, ed, ing, ment, 's) are allowed
     QUANTUM_KEYWORDS = [
-        'quantum', 'qubit', 'entanglement', 'superposition',
-        'decoherence', 'quantum computing', 'quantum mechanics',
-        'quantum algorithm', 'quantum gate', 'quantum circuit',
-        'quantum error correction', 'quantum cryptography',
-        'quantum teleportation', 'bell state', 'bloch sphere',
-        'hamiltonian', 'schrodinger', 'heisenberg', 'pauli',
-        'quantum annealing', 'quantum supremacy', 'qiskit',
-        'quantum information', 'quantum field theory'
-    ]
\ No newline at end of file
+        'quantum', 'qubit', 'qutrit', 'qudit', 'entangle', 'entangling', 'superposition',
+        'decoherence', 'bell state', 'bell inequality', 'bloch sphere',
+        'qiskit', 'cirq', 'shor', 'grover', 'hadamard', 'cnot',
+        'epr pair', 'no-cloning', 'wave function', 'wavefunction',
+        'schrodinger equation', 'uncertainty principle', 'bra-ket',
+        'density matrix', 'topological qubit', 'trapped ion'
+    ]
+
+    # Ambiguous keywords: a match sends the query to the embedding stage
+    QUANTUM_AMBIGUOUS_KEYWORDS = [
+        'hamiltonian', 'schrodinger', 'heisenberg', 'pauli', 'dirac',
+        'spin', 'photon', 'electron', 'gate', 'circuit', 'algorithm',
+        'measurement', 'cryptography', 'teleportation', 'interference',
+        'tunneling', 'tunnelling', 'annealing', 'supremacy', 'advantage',
+        'error correction', 'factor', 'eigenstate', 'operator', 'unitary',
+        'planck', 'wave', 'particle', 'physics'
+    ]
+
+    # Embedding-stage topic gate
+    QUANTUM_TOPIC_SEEDS = [
+        'What is quantum computing and how do qubits work?',
+        'Explain quantum entanglement and Bell states.',
+        'How does superposition work in quantum mechanics?',
+        "How does Shor's algorithm factor large numbers on a quantum computer?",
+        "How does Grover's search algorithm achieve a quadratic speedup?",
+        'What are Pauli matrices and quantum gates?',
+        'What is the Hamiltonian of a quantum system?',
+        'How does quantum error correction protect logical qubits?',
+        'What is decoherence in superconducting and trapped-ion qubits?',
+        'Explain the Heisenberg uncertainty principle and wave functions.',
+        'How does quantum key distribution secure communication?',
+        'What is quantum teleportation?'
+    ]
+    QUANTUM_TOPIC_THRESHOLD = 0.35  # for queries with an ambiguous keyword
+    QUANTUM_TOPIC_STRICT_THRESHOLD = 0.45  # for queries with no keyword at all
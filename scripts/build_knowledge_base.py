@@ -0,0 +1,49 @@
+"""Embed data/knowledge_base.json at build time.
+
+Writes the embedding matrix next to the JSON file (knowledge_base.npy) plus a
+knowledge_base.meta.json fingerprint; KnowledgeBase memory-maps the matrix at
+runtime and only re-embeds (and re-saves) if the fingerprint no longer matches.
+
+Usage:
+    python scripts/build_knowledge_base.py [path/to/knowledge_base.json]
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from config import Config
+from src.knowledge_base import KnowledgeBase
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else Config.KNOWLEDGE_BASE_PATH
+
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+
+    entries = data['entries']
+    ids = [entry['id'] for entry in entries]
+    if len(ids) != len(set(ids)):
+        raise SystemExit("Duplicate entry ids in knowledge base")
+
+    print(f"Embedding {len(entries)} entries with {Config.EMBEDDING_MODEL}...")
+    embedder = SentenceTransformer(Config.EMBEDDING_MODEL)
+    embeddings = embedder.encode(
+        [KnowledgeBase.document_text(entry) for entry in entries],
+        batch_size=Config.EMBEDDING_BATCH_SIZE,
+        show_progress_bar=True,
+        normalize_embeddings=True
+    ).astype(np.float32)
+
+    KnowledgeBase.save_embeddings(path, entries, data['version'], embeddings)
+    npy_path, meta_path = KnowledgeBase.embedding_paths(path)
+    print(f"✓ Wrote {npy_path} and {meta_path}")
+
+
+if __name__ == '__main__':
+    main()
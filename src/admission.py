@@ -0,0 +1,155 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+from src import metrics
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted before its deadline"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Concurrency cap with a bounded FIFO wait queue and per-request deadlines"""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._next_ticket = 0
+        self._serving_ticket = 0
+        self._abandoned = set()
+
+        # Running statistics, updated under the lock
+        self._admitted = 0
+        self._rejected = 0
+        self._avg_wait = 0.0
+        self._max_wait = 0.0
+        self._avg_service = 0.0
+
+    def acquire(self, timeout: Optional[float] = None) -> float:
+        """Wait for a slot and return the time spent queued.
+
+        Raises AdmissionRejected immediately if the queue is full, or once the
+        request's deadline passes while it is still waiting. A missing or
+        non-finite timeout means the controller's queue_timeout.
+        """
+        if timeout is None or not math.isfinite(timeout):
+            timeout = self.queue_timeout
+        timeout = max(0.0, min(timeout, self.queue_timeout))
+        start = time.monotonic()
+        deadline = start + timeout
+
+        with self._cond:
+            if self._active < self.max_concurrent and self._waiting == 0:
+                self._active += 1
+                self._record_admit(0.0)
+                return 0.0
+
+            if self._waiting >= self.max_queue:
+                self._record_reject('queue_full')
+                raise AdmissionRejected(f'{self.name} queue is full', self._retry_after())
+
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self._waiting += 1
+
+            try:
+                while not (self._active < self.max_concurrent and ticket == self._serving_ticket):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._record_reject('timeout')
+                        raise AdmissionRejected(f'{self.name} queue wait timed out', self._retry_after())
+                    self._cond.wait(remaining)
+            except AdmissionRejected:
+                # Give up this ticket's turn so later waiters are not blocked behind it
+                self._abandoned.add(ticket)
+                self._skip_abandoned()
+                self._cond.notify_all()
+                raise
+            finally:
+                self._waiting -= 1
+
+            self._serving_ticket += 1
+            self._skip_abandoned()
+            self._active += 1
+            waited = time.monotonic() - start
+            self._record_admit(waited)
+            self._cond.notify_all()
+            return waited
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free and nobody is queued; never waits.
+
+        For background work: a refusal is not an overload, so it is not
+        counted as a rejection (and admissions are not counted either).
+        """
+        with self._cond:
+            if self._active < self.max_concurrent and self._waiting == 0:
+                self._active += 1
+                return True
+            return False
+
+    def release(self, service_time: Optional[float] = None):
+        """Free a slot, optionally recording how long the request held it"""
+        with self._cond:
+            self._active -= 1
+            if service_time is not None:
+                self._avg_service = 0.9 * self._avg_service + 0.1 * service_time
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, timeout: Optional[float] = None):
+        """Hold a slot for the duration of the block"""
+        self.acquire(timeout)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                'active': self._active,
+                'max_concurrent': self.max_concurrent,
+                'queue_depth': self._waiting,
+                'max_queue': self.max_queue,
+                'admitted': self._admitted,
+                'rejected': self._rejected,
+                'avg_wait_ms': round(self._avg_wait * 1000, 1),
+                'max_wait_ms': round(self._max_wait * 1000, 1),
+                'avg_service_ms': round(self._avg_service * 1000, 1)
+            }
+
+    def _skip_abandoned(self):
+        while self._serving_ticket in self._abandoned:
+            self._abandoned.discard(self._serving_ticket)
+            self._serving_ticket += 1
+
+    def _record_admit(self, waited: float):
+        metrics.ADMISSION_WAIT_SECONDS.observe(waited, controller=self.name)
+        self._admitted += 1
+        self._avg_wait = 0.9 * self._avg_wait + 0.1 * waited
+        self._max_wait = max(self._max_wait, waited)
+
+    def _record_reject(self, reason: str):
+        metrics.ADMISSION_REJECTIONS.inc(controller=self.name, reason=reason)
+        self._rejected += 1
+
+    def _retry_after(self) -> int:
+        """Seconds until a slot is likely to free up, assuming the queue drains at the average rate"""
+        if not self._avg_service:
+            return 1
+        backlog = (self._waiting + 1) / max(self.max_concurrent, 1)
+        return max(1, int(round(backlog * self._avg_service)))
@@ -0,0 +1,49 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class AnswerCache:
+    """Thread-safe LRU cache of pipeline responses with a time-to-live"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return a copy of the cached response, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            stored_at, response = entry
+            if time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return copy.deepcopy(response)
+
+    def remaining_ttl(self, key: str) -> Optional[float]:
+        """Seconds until the entry expires (without copying it), or None if it is not cached"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            remaining = self.ttl - (time.time() - entry[0])
+            return remaining if remaining > 0 else None
+
+    def put(self, key: str, response: Dict):
+        with self._lock:
+            self._entries[key] = (time.time(), copy.deepcopy(response))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,90 +1,142 @@
+import io
+import logging
+import time
 import requests
 import xml.etree.ElementTree as ET
-from typing import List, Dict
+from typing import List, Iterator, Optional
 from config import Config
+from src import metrics
+from src.answer_cache import AnswerCache
+from src.document import Document
+from src.politeness import PolitenessQueueFull, PolitenessScheduler
+
+logger = logging.getLogger(__name__)
+
+
+ATOM = '{http://www.w3.org/2005/Atom}'
 
 
 class ArxivSearcher:
     """Search arXiv for quantum mechanics and quantum computing papers"""
 
-    def __init__(self):
+    def __init__(self, scheduler: Optional[PolitenessScheduler] = None):
         self.max_results = Config.ARXIV_MAX_RESULTS
-        self.base_url = "http://export.arxiv.org/api/query"
+        self.base_url = Config.ARXIV_API_URL
+
+        # Shared across gunicorn workers on the host so together they respect arXiv's rate limit
+        self.scheduler = scheduler or PolitenessScheduler(
+            Config.ARXIV_SCHEDULE_FILE,
+            min_interval=Config.ARXIV_MIN_INTERVAL,
+            max_wait=Config.ARXIV_MAX_SCHEDULE_WAIT,
+            background_max_wait=Config.ARXIV_BACKGROUND_MAX_SCHEDULE_WAIT
+        )
+        self.page_cache = AnswerCache(Config.ARXIV_CACHE_SIZE, Config.ARXIV_CACHE_TTL)
+
+    def search(self, query: str, max_results: int = None, start: int = 0,
+               max_wait: float = None, deadline: float = None, background: bool = False) -> List[Document]:
+        """Search arXiv for papers related to the query.
+
+        Returns results [start, start + max_results). Deeper pages are only
+        requested when a caller asks for them. max_wait overrides how long to
+        queue for the host-wide politeness slot; PolitenessQueueFull is raised
+        when it is further away. Background callers yield slots to interactive
+        ones and wait longer for their own. With a deadline (time.monotonic()),
+        the papers parsed so far are returned once it passes instead of waiting
+        for the rest of the response. Only complete pages are cached.
+        """
+        max_results = max_results or self.max_results
+        cache_key = f'{query.lower()}|{start}|{max_results}'
+
+        cached = self.page_cache.get(cache_key)
+        metrics.CACHE_REQUESTS.inc(cache='arxiv', result='hit' if cached is not None else 'miss')
+        if cached is not None:
+            return cached
 
-    def search(self, query: str) -> List[Dict]:
-        """Search arXiv for papers related to the query"""
+        results = []
+        complete = False
         try:
-            # Enhance query with quantum-specific terms
-            enhanced_query = f'all:{query} AND (cat:quant-ph OR cat:cond-mat.mes-hall)'
+            for paper in self.iter_papers(query, start=start, max_wait=max_wait, background=background):
+                results.append(paper)
+                if len(results) >= max_results:
+                    break
+                if deadline is not None and time.monotonic() >= deadline:
+                    logger.debug('arXiv deadline reached after %s papers', len(results))
+                    return results
+            complete = True
+        except PolitenessQueueFull:
+            if not results:
+                raise
+        except Exception as e:
+            metrics.UPSTREAM_ERRORS.inc(source='arXiv')
+            logger.warning('arXiv search error: %s', e)
+
+        if complete:
+            self.page_cache.put(cache_key, results)
+        return results
+
+    def iter_papers(self, query: str, start: int = 0, max_wait: float = None,
+                    background: bool = False) -> Iterator[Document]:
+        """Yield papers as they are parsed off the wire, paging lazily while the caller keeps consuming"""
+        # Enhance query with quantum-specific terms
+        enhanced_query = f'all:{query} AND (cat:quant-ph OR cat:cond-mat.mes-hall)'
+
+        while start < Config.ARXIV_MAX_DEPTH:
+            page_size = min(self.max_results, Config.ARXIV_MAX_DEPTH - start)
+
+            if not self.scheduler.wait_turn(max_wait, background):
+                raise PolitenessQueueFull('arXiv politeness queue is full')
 
             params = {
                 'search_query': enhanced_query,
-                'start': 0,
-                'max_results': self.max_results,
+                'start': start,
+                'max_results': page_size,
                 'sortBy': 'relevance',
                 'sortOrder': 'descending'
             }
 
-            response = requests.get(self.base_url, params=params, timeout=10)
-            response.raise_for_status()
+            with requests.get(self.base_url, params=params, timeout=10, stream=True) as response:
+                response.raise_for_status()
+                response.raw.decode_content = True
 
-            results = self._parse_arxiv_response(response.text)
-            return results
+                count = 0
+                for paper in self._iter_entries(response.raw):
+                    count += 1
+                    yield paper
 
-        except Exception as e:
-            print(f"arXiv search error: {e}")
-            return []
+            if count < page_size:
+                return
+            start += count
 
-    def _parse_arxiv_response(self, xml_text: str) -> List[Dict]:
+    def _parse_arxiv_response(self, xml_text: str) -> List[Document]:
         """Parse arXiv API XML response"""
-        results = []
-
         try:
-            root = ET.fromstring(xml_text)
-
-            ns = {
-                'atom': 'http://www.w3.org/2005/Atom',
-                'arxiv': 'http://arxiv.org/schemas/atom'
-            }
-
-            for entry in root.findall('atom:entry', ns):
-                try:
-                    title_elem = entry.find('atom:title', ns)
-                    title = title_elem.text.strip().replace('\n', ' ') if title_elem is not None else 'No title'
-
-                    summary_elem = entry.find('atom:summary', ns)
-                    summary = summary_elem.text.strip().replace('\n', ' ') if summary_elem is not None else 'No summary'
-
-                    authors = []
-                    for author in entry.findall('atom:author', ns):
-                        name_elem = author.find('atom:name', ns)
-                        if name_elem is not None:
-                            authors.append(name_elem.text.strip())
-
-                    link_elem = entry.find('atom:id', ns)
-                    link = link_elem.text.strip() if link_elem is not None else ''
+            return list(self._iter_entries(io.BytesIO(xml_text.encode('utf-8'))))
+        except Exception as e:
+            logger.warning('Error parsing arXiv XML: %s', e)
+            return []
 
-                    published_elem = entry.find('atom:published', ns)
-                    published = published_elem.text[:10] if published_elem is not None else ''
+    def _iter_entries(self, stream) -> Iterator[Document]:
+        """Incrementally parse Atom entries from a file-like byte stream"""
+        for event, elem in ET.iterparse(stream, events=('end',)):
+            if elem.tag != f'{ATOM}entry':
+                continue
 
-                    pdf_url = link.replace('abs', 'pdf') + '.pdf' if link else ''
+            try:
+                yield self._parse_entry(elem)
+            except Exception as e:
+                logger.warning('Error parsing entry: %s', e)
+            finally:
+                elem.clear()
 
-                    results.append({
-                        'title': title,
-                        'summary': summary,
-                        'authors': authors,
-                        'published': published,
-                        'link': link,
-                        'pdf_url': pdf_url,
-                        'source': 'arXiv'
-                    })
+    @staticmethod
+    def _parse_entry(entry) -> Document:
+        title_elem = entry.find(f'{ATOM}title')
+        title = title_elem.text.strip().replace('\n', ' ') if title_elem is not None else 'No title'
 
-                except Exception as e:
-                    print(f"Error parsing entry: {e}")
-                    continue
+        summary_elem = entry.find(f'{ATOM}summary')
+        summary = summary_elem.text.strip().replace('\n', ' ') if summary_elem is not None else 'No summary'
 
-            return results
+        link_elem = entry.find(f'{ATOM}id')
+        link = link_elem.text.strip() if link_elem is not None else ''
 
-        except Exception as e:
-            print(f"Error parsing arXiv XML: {e}")
-            return []
\ No newline at end of file
+        return Document(title, summary, link, source='arXiv', origin='arXiv')
@@ -0,0 +1,54 @@
+import sys
+from typing import Dict, Optional, Tuple
+import numpy as np
+from config import Config
+
+
+class Document:
+    """One search result, from the searcher that found it through to the response's sources.
+
+    The snippet is truncated once, here; source names are interned so every
+    document shares the same few strings. The index, sessions and retrieved
+    context all hold references to the same instance, and documents are never
+    modified after construction, so copying one returns it unchanged.
+    """
+
+    __slots__ = ('title', 'snippet', 'link', 'source', 'origin', 'embedding')
+
+    def __init__(self, title: str, snippet: str, link: str, source: str, origin: str,
+                 embedding: Optional[np.ndarray] = None):
+        self.title = title
+        self.snippet = snippet[:Config.SNIPPET_MAX_CHARS]
+        self.link = link
+        # Result type shown to users (e.g. 'Wikipedia') and the upstream source that returned it
+        self.source = sys.intern(source)
+        self.origin = sys.intern(origin)
+        # Precomputed embedding (a row of the knowledge base matrix), or None
+        self.embedding = embedding
+
+    @staticmethod
+    def compose_text(title: str, snippet: str) -> str:
+        """Text that is embedded for a result; also fingerprints the knowledge base's stored embeddings"""
+        return f'{title}. {snippet[:Config.SNIPPET_MAX_CHARS]}'
+
+    @property
+    def text(self) -> str:
+        """Text that is embedded and quoted to the LLM"""
+        return self.compose_text(self.title, self.snippet)
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        """Identity used to de-duplicate the same result returned by several queries"""
+        return self.link, self.title
+
+    def as_source(self) -> Dict:
+        return {'title': self.title, 'link': self.link, 'type': self.source}
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self) -> str:
+        return f'Document({self.title!r}, source={self.source!r})'
@@ -0,0 +1,33 @@
+import os
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking
+    fcntl = None
+
+
+@contextmanager
+def exclusive_lock(path: str) -> Iterator[Optional[int]]:
+    """Hold an exclusive flock on path (created if missing) and yield its file descriptor.
+
+    Yields None where the lock cannot be taken (no fcntl on Windows, or the file
+    cannot be opened); callers then fall back to per-process behaviour.
+    """
+    if fcntl is None:
+        yield None
+        return
+
+    try:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+    except OSError:
+        yield None
+        return
+
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield fd
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
@@ -1,6 +1,11 @@
+import logging
 from googleapiclient.discovery import build
-from typing import List, Dict, Optional
+from typing import List, Optional
 from config import Config
+from src import metrics
+from src.document import Document
+
+logger = logging.getLogger(__name__)
 
 
 class GoogleSearcher:
@@ -14,7 +19,7 @@ class GoogleSearcher:
         """Check if API credentials are configured"""
         return bool(self.api_key and self.cse_id)
 
-    def search(self, query: str) -> List[Dict]:
+    def search(self, query: str) -> List[Document]:
         """Search using Google Custom Search"""
         if not self.is_configured():
             return []
@@ -34,15 +39,17 @@ class GoogleSearcher:
 
             if 'items' in result:
                 for item in result['items']:
-                    results.append({
-                        'title': item.get('title', ''),
-                        'snippet': item.get('snippet', ''),
-                        'link': item.get('link', ''),
-                        'source': 'Google'
-                    })
+                    results.append(Document(
+                        item.get('title', ''),
+                        item.get('snippet', ''),
+                        item.get('link', ''),
+                        source='Google',
+                        origin='Google'
+                    ))
 
             return results
 
         except Exception as e:
-            print(f"Google search error: {e}")
+            metrics.UPSTREAM_ERRORS.inc(source='Google')
+            logger.warning('Google search error: %s', e)
             return []
\ No newline at end of file
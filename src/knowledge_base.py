@@ -0,0 +1,161 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Callable, List, Dict, Optional
+import numpy as np
+from config import Config
+from src.document import Document
+from src.file_lock import exclusive_lock
+
+logger = logging.getLogger(__name__)
+
+
+class KnowledgeBase:
+    """Curated offline articles with precomputed, memory-mapped embeddings.
+
+    Content lives in a versioned JSON file. `scripts/build_knowledge_base.py`
+    embeds it at build time into a .npy matrix plus a .meta.json sidecar; at
+    runtime the matrix is opened with mmap so it costs no embedding work and is
+    shared between worker processes through the page cache. If the matrix is
+    missing or stale, the first process to start embeds the entries and saves
+    the matrix for every later worker and restart.
+    """
+
+    def __init__(self, path: str = None, encoder: Optional[Callable[[List[str]], np.ndarray]] = None,
+                 persist: bool = True):
+        self.path = path or Config.KNOWLEDGE_BASE_PATH
+        self.encoder = encoder
+        # Save fallback embeddings for later workers; off when the encoder is not the configured model
+        self.persist = persist
+
+        with open(self.path, encoding='utf-8') as f:
+            data = json.load(f)
+
+        self.version = data['version']
+        self.entries = data['entries']
+        self.collections = np.array([entry['collection'] for entry in self.entries])
+        self.embeddings = self._load_embeddings()
+        # Built once; searches hand out these instances rather than new dicts.
+        # Knowledge base results reach the pipeline through the 'Web' source.
+        self.documents = [
+            Document(entry['title'], entry['snippet'], entry['link'], source=entry['source'], origin='Web',
+                     embedding=self.embeddings[idx] if self.embeddings is not None else None)
+            for idx, entry in enumerate(self.entries)
+        ]
+
+        logger.info('[KnowledgeBase] ✓ Loaded %s entries (v%s)', len(self.entries), self.version)
+
+    @staticmethod
+    def embedding_paths(path: str):
+        base, _ = os.path.splitext(path)
+        return base + '.npy', base + '.meta.json'
+
+    @staticmethod
+    def document_text(entry: Dict) -> str:
+        """Text embedded for an entry, identical to its Document.text"""
+        return Document.compose_text(entry['title'], entry['snippet'])
+
+    @classmethod
+    def fingerprint(cls, entries: List[Dict]) -> Dict:
+        """Everything that invalidates the precomputed embeddings when it changes"""
+        digest = hashlib.sha256()
+        for entry in entries:
+            digest.update(cls.document_text(entry).encode('utf-8'))
+            digest.update(b'\0')
+
+        return {
+            'content_sha256': digest.hexdigest(),
+            'count': len(entries),
+            'model': Config.EMBEDDING_MODEL,
+            'snippet_max_chars': Config.SNIPPET_MAX_CHARS
+        }
+
+    @classmethod
+    def save_embeddings(cls, path: str, entries: List[Dict], version, embeddings: np.ndarray):
+        """Write the matrix and its fingerprint next to the JSON file, each replaced atomically"""
+        npy_path, meta_path = cls.embedding_paths(path)
+        directory = os.path.dirname(npy_path) or '.'
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.npy.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, np.asarray(embeddings, dtype=np.float32))
+        os.replace(tmp_path, npy_path)
+
+        meta = cls.fingerprint(entries)
+        meta['version'] = version
+        meta['dimension'] = int(embeddings.shape[1])
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.json.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_path, meta_path)
+
+    def _load_precomputed(self, warn: bool = True) -> Optional[np.ndarray]:
+        npy_path, meta_path = self.embedding_paths(self.path)
+        expected = self.fingerprint(self.entries)
+
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+
+            if all(meta.get(key) == value for key, value in expected.items()):
+                return np.load(npy_path, mmap_mode='r')
+
+            if warn:
+                logger.warning('[KnowledgeBase] ⚠ Precomputed embeddings are stale')
+        except (OSError, ValueError) as e:
+            if warn:
+                logger.warning('[KnowledgeBase] ⚠ No precomputed embeddings: %s', e)
+        return None
+
+    def _load_embeddings(self) -> Optional[np.ndarray]:
+        embeddings = self._load_precomputed()
+        if embeddings is not None or self.encoder is None or not self.entries:
+            return embeddings
+
+        if not self.persist:
+            return np.asarray(self.encoder([self.document_text(entry) for entry in self.entries]), dtype=np.float32)
+
+        # Workers starting together: the first embeds and saves, the rest map its matrix
+        with exclusive_lock(os.path.splitext(self.path)[0] + '.lock'):
+            embeddings = self._load_precomputed(warn=False)
+            if embeddings is not None:
+                return embeddings
+
+            logger.error('[KnowledgeBase] ✗ Embedding %s entries at startup; run '
+                         'scripts/build_knowledge_base.py at build time to skip this', len(self.entries))
+            embeddings = np.asarray(self.encoder([self.document_text(entry) for entry in self.entries]),
+                                    dtype=np.float32)
+
+            npy_path, _ = self.embedding_paths(self.path)
+            try:
+                self.save_embeddings(self.path, self.entries, self.version, embeddings)
+            except OSError as e:
+                logger.error('[KnowledgeBase] ✗ Could not save embeddings, every worker will re-embed: %s', e)
+                return embeddings
+
+            logger.warning('[KnowledgeBase] ⚠ Saved embeddings to %s', npy_path)
+            return np.load(npy_path, mmap_mode='r')
+
+    def search(self, query: str, collection: str = None, top_k: int = None,
+               query_embedding: np.ndarray = None) -> List[Document]:
+        """Nearest entries to the query, best first, each carrying its precomputed embedding"""
+        if self.embeddings is None or not self.entries:
+            return []
+
+        if query_embedding is None:
+            if self.encoder is None:
+                return []
+            query_embedding = self.encoder([query])[0]
+
+        top_k = Config.KNOWLEDGE_BASE_TOP_K if top_k is None else top_k
+        similarities = self.embeddings @ query_embedding
+
+        candidates = np.flatnonzero(similarities >= Config.KNOWLEDGE_BASE_MIN_SIMILARITY)
+        if collection is not None:
+            candidates = candidates[self.collections[candidates] == collection]
+
+        ranked = candidates[np.argsort(similarities[candidates])[::-1][:top_k]]
+
+        return [self.documents[idx] for idx in ranked]
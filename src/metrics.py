@@ -0,0 +1,167 @@
+"""Low-overhead in-process metrics with Prometheus text exposition.
+
+Metrics are per process; with several gunicorn workers each one serves its own
+/metrics and the scraper aggregates them.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+from src import profiling
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _label_key(labelnames: Sequence[str], labels: Dict[str, str]) -> Tuple[str, ...]:
+    return tuple(str(labels.get(name, '')) for name in labelnames)
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple[str, ...], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label key -> [per-bucket counts..., +Inf count, sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            state[index] += 1
+            state[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state):
+                    cumulative += count
+                    labels = _format_labels(self.labelnames, key, f'le="{bound}"')
+                    lines.append(f'{self.name}_bucket{labels} {cumulative}')
+                cumulative += state[len(self.buckets)]
+                labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+                lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {state[-1]}')
+                lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}')
+        return lines
+
+
+class Gauge:
+    """Gauge whose labelled values are read from a callback at scrape time"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._callbacks = []
+
+    def set_function(self, callback: Callable[[], float], **labels):
+        self._callbacks.append((_label_key(self.labelnames, labels), callback))
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge']
+        for key, callback in self._callbacks:
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {callback()}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'rag_stage_seconds', 'Time spent in each pipeline stage', ['stage']))
+SOURCE_SECONDS = REGISTRY.register(Histogram(
+    'rag_source_seconds', 'Upstream retrieval time per source', ['source']))
+LLM_SECONDS = REGISTRY.register(Histogram(
+    'rag_llm_seconds', 'LLM time to first token and total generation time', ['phase']))
+DOCUMENTS = REGISTRY.register(Histogram(
+    'rag_documents', 'Documents per request at each pipeline stage', ['stage'], buckets=COUNT_BUCKETS))
+UPSTREAM_ERRORS = REGISTRY.register(Counter(
+    'rag_upstream_errors_total', 'Failed upstream calls', ['source']))
+SOURCES_SKIPPED = REGISTRY.register(Counter(
+    'rag_sources_skipped_total', 'Upstream calls skipped because no politeness slot was free in time', ['source']))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    'rag_cache_requests_total', 'Cache lookups by result', ['cache', 'result']))
+REQUESTS = REGISTRY.register(Counter(
+    'rag_requests_total', 'HTTP API requests by endpoint and status', ['endpoint', 'status']))
+PREWARM_QUERIES = REGISTRY.register(Counter(
+    'rag_prewarm_queries_total', 'Background refreshes of popular queries by result', ['result']))
+ADMISSION_WAIT_SECONDS = REGISTRY.register(Histogram(
+    'rag_admission_wait_seconds', 'Time spent queued for admission', ['controller']))
+ADMISSION_REJECTIONS = REGISTRY.register(Counter(
+    'rag_admission_rejections_total', 'Requests refused by admission control', ['controller', 'reason']))
+ADMISSION_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'rag_admission_queue_depth', 'Requests waiting for admission', ['controller']))
+ADMISSION_ACTIVE = REGISTRY.register(Gauge(
+    'rag_admission_active', 'Requests currently admitted', ['controller']))
+
+
+@contextmanager
+def stage(name: str):
+    """Time a pipeline stage: `with metrics.stage('fetch'): ...`
+
+    Also records the stage as a span when the request is being profiled.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        STAGE_SECONDS.observe(end - start, stage=name)
+        profiling.add_span(name, start, end)
@@ -0,0 +1,483 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Iterator, Optional, Tuple
+import numpy as np
+from config import Config
+from src import metrics, profiling
+from src.document import Document
+from src.politeness import PolitenessQueueFull
+
+logger = logging.getLogger(__name__)
+
+
+class QueryPipeline:
+    """Multi-source RAG pipeline for a single query or a batch of queries"""
+
+    def __init__(self, arxiv_searcher, serpapi_searcher, google_searcher,
+                 web_scraper, query_processor, rag_engine, answer_cache=None,
+                 source_selector=None):
+        self.arxiv_searcher = arxiv_searcher
+        self.serpapi_searcher = serpapi_searcher
+        self.google_searcher = google_searcher
+        self.web_scraper = web_scraper
+        self.query_processor = query_processor
+        self.rag_engine = rag_engine
+        self.answer_cache = answer_cache
+        self.source_selector = source_selector
+
+    def validate(self, user_query: str) -> Tuple[str, Optional[str], Optional[np.ndarray]]:
+        """Return (processed_query, error, query_embedding) for a raw user query.
+
+        The embedding is whatever the topic gate already computed (or None),
+        also for rejected queries, so retrieval and the follow-up gate can reuse
+        it instead of encoding the query again.
+        """
+        return self.validate_batch([user_query])[0]
+
+    def validate_batch(self, user_queries: List[str]) -> List[Tuple[str, Optional[str], Optional[np.ndarray]]]:
+        """validate() for many queries; the topic gate embeds all ambiguous ones in one batch"""
+        results = [('', 'No query provided', None)] * len(user_queries)
+        to_classify = [i for i, user_query in enumerate(user_queries) if user_query]
+        processed = [self.query_processor.process(user_queries[i]) for i in to_classify]
+        decisions = self.query_processor.classify_batch(processed)
+
+        for i, processed_query, (is_related, query_embedding) in zip(to_classify, processed, decisions):
+            if is_related:
+                results[i] = (processed_query, None, query_embedding)
+            else:
+                results[i] = (processed_query, 'Query must be related to quantum mechanics or quantum computing',
+                              query_embedding)
+
+        return results
+
+    def cache_key(self, user_query: str) -> str:
+        return self.query_processor.process(user_query).lower()
+
+    def cached_answer(self, user_query: str) -> Optional[Dict]:
+        """Return a cached response for the query without running the pipeline"""
+        if self.answer_cache is None or not user_query:
+            return None
+
+        response = self.answer_cache.get(self.cache_key(user_query))
+        metrics.CACHE_REQUESTS.inc(cache='answer', result='hit' if response is not None else 'miss')
+        if response is None:
+            return None
+
+        response['query'] = user_query
+        response['debug']['cached'] = True
+        return response
+
+    def _store(self, processed_query: str, response: Dict):
+        # A degraded answer (skipped source, LLM fallback) would be served for the whole TTL
+        debug = response['debug']
+        if self.answer_cache is not None and not debug['sources_skipped'] and not debug['degraded']:
+            self.answer_cache.put(processed_query.lower(), response)
+
+    def available_sources(self) -> List[str]:
+        """Names of the upstream sources that can be called right now"""
+        sources = ['arXiv']
+        if self.serpapi_searcher.is_configured():
+            sources.append('SerpAPI')
+        if self.google_searcher.is_configured():
+            sources.append('Google')
+        sources.append('Web')
+        return sources
+
+    def fetch_documents(self, query: str, query_embedding: np.ndarray = None,
+                        background: bool = False) -> Tuple[List[Document], Dict]:
+        """Retrieve candidate documents from the selected sources.
+
+        Interactive requests skip arXiv when its politeness queue is long;
+        background (batch and pre-warm) requests wait for their slot instead.
+        """
+        query_class = None
+        sources = self.available_sources()
+
+        if self.source_selector is not None:
+            query_class = self.source_selector.classify(query)
+            sources = self.source_selector.select(query_class, sources)
+
+        searchers = {
+            'arXiv': lambda q: self.arxiv_searcher.search(q, background=background),
+            'SerpAPI': self.serpapi_searcher.search,
+            'Google': self.google_searcher.search,
+            'Web': lambda q: self.web_scraper.search_all(q, query_embedding)
+        }
+
+        all_documents = []
+        arxiv_count = 0
+        web_count = 0
+        skipped = []
+
+        for source in sources:
+            start = time.perf_counter()
+            try:
+                results = searchers[source](query)
+                error = False
+            except PolitenessQueueFull as e:
+                metrics.SOURCES_SKIPPED.inc(source=source)
+                logger.warning('   ○ %s skipped: %s', source, e)
+                skipped.append(source)
+                continue
+            except Exception as e:
+                metrics.UPSTREAM_ERRORS.inc(source=source)
+                logger.warning('   ✗ %s error: %s', source, e)
+                results = []
+                error = True
+
+            elapsed = time.perf_counter() - start
+            metrics.SOURCE_SECONDS.observe(elapsed, source=source)
+            profiling.add_span(f'source:{source}', start, start + elapsed)
+            if self.source_selector is not None:
+                self.source_selector.record_call(source, elapsed, error)
+
+            if source == 'arXiv':
+                arxiv_count += len(results)
+                logger.debug('   ✓ arXiv: %s papers', len(results))
+            else:
+                web_count += len(results)
+                logger.debug('   ✓ %s: %s results', source, len(results))
+            all_documents.extend(results)
+
+        counts = {
+            'arxiv_count': arxiv_count,
+            'web_count': web_count,
+            'query_class': query_class,
+            'sources_called': [source for source in sources if source not in skipped],
+            'sources_skipped': skipped
+        }
+        return all_documents, counts
+
+    def _needs_more_candidates(self, similarities: np.ndarray, counts: Dict) -> bool:
+        """True while too few candidates are relevant and arXiv may have more to offer"""
+        if 'arXiv' not in counts['sources_called']:
+            return False
+
+        arxiv_count = counts['arxiv_count']
+        page_size = self.arxiv_searcher.max_results
+        if arxiv_count == 0 or arxiv_count % page_size or arxiv_count >= Config.ARXIV_MAX_DEPTH:
+            return False
+
+        relevant = int(np.count_nonzero(similarities >= Config.RETRIEVAL_MIN_SIMILARITY))
+        return relevant < Config.RETRIEVAL_MIN_RELEVANT
+
+    def _fetch_more_arxiv(self, query: str, counts: Dict, deadline: float) -> List[Document]:
+        """Fetch the next page of arXiv results after those already retrieved, by deadline (time.monotonic())"""
+        start = time.perf_counter()
+        try:
+            papers = self.arxiv_searcher.search(query, start=counts['arxiv_count'],
+                                                max_wait=deadline - time.monotonic(), deadline=deadline)
+        except PolitenessQueueFull:
+            logger.debug('   ○ arXiv (deeper page): no politeness slot within the paging budget')
+            return []
+
+        elapsed = time.perf_counter() - start
+        metrics.SOURCE_SECONDS.observe(elapsed, source='arXiv')
+        profiling.add_span('source:arXiv', start, start + elapsed)
+        if self.source_selector is not None:
+            self.source_selector.record_call('arXiv', elapsed)
+
+        counts['arxiv_count'] += len(papers)
+        logger.debug('   ✓ arXiv (deeper page): %s papers', len(papers))
+        return papers
+
+    def _record_outcome(self, counts: Dict, retrieved_docs: List[Document]):
+        if self.source_selector is not None:
+            self.source_selector.record_outcome(counts['query_class'], counts['sources_called'], retrieved_docs)
+
+    def answer(self, user_query: str, background: bool = False) -> Dict:
+        """Run the full pipeline for one query; the result has an 'error' key on rejection.
+
+        Background callers (pre-warming) queue for rate-limited sources instead of skipping them.
+        """
+        with metrics.stage('topic_gate'):
+            processed_query, error, query_embedding = self.validate(user_query)
+        if error:
+            return {'error': error}
+
+        logger.info('[RAG PIPELINE] Query: %s', processed_query)
+
+        if query_embedding is None:
+            with metrics.stage('embed_query'):
+                query_embedding = self.rag_engine.encode([processed_query])[0]
+
+        logger.info('📚 Step 1: Multi-source retrieval...')
+        with metrics.stage('fetch'):
+            all_documents, counts = self.fetch_documents(processed_query, query_embedding, background)
+        metrics.DOCUMENTS.observe(len(all_documents), stage='fetched')
+
+        logger.info('🔍 Step 2: Indexing %s documents...', len(all_documents))
+        with metrics.stage('embed_documents'):
+            _, embeddings = self.rag_engine.build_index(all_documents)
+
+        logger.info('🎯 Step 3: Semantic search...')
+        with metrics.stage('vector_search'):
+            similarities = embeddings @ query_embedding
+
+        # Page deeper into arXiv only when the retrieved context is too weak, within a time budget
+        paging_deadline = time.monotonic() + Config.ARXIV_PAGING_BUDGET
+        while self._needs_more_candidates(similarities, counts) and time.monotonic() < paging_deadline:
+            more = self._fetch_more_arxiv(processed_query, counts, paging_deadline)
+            if not more:
+                break
+
+            with metrics.stage('embed_documents'):
+                _, more_embeddings = self.rag_engine.build_index(more)
+            all_documents.extend(more)
+            embeddings = np.vstack([embeddings, more_embeddings])
+            similarities = embeddings @ query_embedding
+
+        with metrics.stage('vector_search'):
+            top_indices = self.rag_engine.top_k_indices(similarities, Config.RETRIEVAL_TOP_K)
+            retrieved_docs = self.rag_engine.collect(all_documents, top_indices)
+        metrics.DOCUMENTS.observe(len(all_documents), stage='indexed')
+        metrics.DOCUMENTS.observe(len(retrieved_docs), stage='retrieved')
+        logger.debug('[RAG] ✓ Retrieved %s relevant documents', len(retrieved_docs))
+        self._record_outcome(counts, retrieved_docs)
+
+        logger.info('🤖 Step 4: Generating answer...')
+        with metrics.stage('generate'):
+            result = self.rag_engine.generate_answer(processed_query, retrieved_docs)
+
+        logger.info('✅ Complete! Generated by: %s', result['generated_by'])
+
+        response = self._build_response(user_query, result, counts, len(all_documents), len(retrieved_docs))
+        self._store(processed_query, response)
+        return response
+
+    def answer_in_session(self, user_query: str, session) -> Dict:
+        """Answer one turn of a conversation, reusing the documents its earlier turns retrieved.
+
+        A follow-up the topic gate rejects is still accepted when it is relevant
+        to the session's documents. Follow-ups search the session's own index
+        first; upstream sources are only called when too few session documents
+        are relevant. Session answers are not put in the shared answer cache.
+        """
+        with session.lock:
+            follow_up = bool(session.turns)
+
+            with metrics.stage('topic_gate'):
+                processed_query, error, query_embedding = self.validate(user_query)
+                if error and follow_up and processed_query:
+                    error = self._gate_follow_up(processed_query, query_embedding, session)
+            if error:
+                return {'error': error}
+
+            # Follow-ups are retrieved with the previous question as context, so re-embed below
+            if follow_up:
+                query_embedding = None
+
+            logger.info('[RAG SESSION] Turn %s: %s', session.turn_count + 1, processed_query)
+
+            search_text = session.contextualize(processed_query)
+            if query_embedding is None:
+                with metrics.stage('embed_query'):
+                    query_embedding = self.rag_engine.encode([search_text])[0]
+
+            with metrics.stage('session_search'):
+                similarities = session.similarities(query_embedding)
+            relevant = int(np.count_nonzero(similarities >= Config.RETRIEVAL_MIN_SIMILARITY))
+
+            counts = {'arxiv_count': 0, 'web_count': 0, 'query_class': None,
+                      'sources_called': [], 'sources_skipped': []}
+            session_hit = relevant >= Config.SESSION_MIN_RELEVANT
+            if not session_hit:
+                with metrics.stage('fetch'):
+                    documents, counts = self.fetch_documents(search_text, query_embedding)
+                metrics.DOCUMENTS.observe(len(documents), stage='fetched')
+
+                with metrics.stage('embed_documents'):
+                    entries, embeddings = self.rag_engine.build_index(documents)
+                session.add_documents(entries, embeddings)
+                similarities = session.similarities(query_embedding)
+            metrics.CACHE_REQUESTS.inc(cache='session', result='hit' if session_hit else 'miss')
+
+            with metrics.stage('vector_search'):
+                top_indices = self.rag_engine.top_k_indices(similarities, Config.RETRIEVAL_TOP_K)
+                retrieved_docs = self.rag_engine.collect(session.entries, top_indices)
+            metrics.DOCUMENTS.observe(len(retrieved_docs), stage='retrieved')
+            if counts['sources_called']:
+                self._record_outcome(counts, retrieved_docs)
+
+            history = session.history(Config.SESSION_HISTORY_TOKEN_BUDGET)
+            with metrics.stage('generate'):
+                result = self.rag_engine.generate_answer(processed_query, retrieved_docs, history)
+            session.add_turn(processed_query, result)
+
+            response = self._build_response(user_query, result, counts, len(session.entries), len(retrieved_docs))
+            response['session_id'] = session.session_id
+            response['debug']['session_turn'] = session.turn_count
+            response['debug']['session_hit'] = session_hit
+            return response
+
+    def _gate_follow_up(self, processed_query: str, query_embedding: Optional[np.ndarray], session) -> Optional[str]:
+        """Error for a follow-up the topic gate rejected, or None if it is close enough to the conversation.
+
+        Short follow-ups ("and how is it measured?") rarely name the topic, so they
+        pass when enough of the session's documents are relevant to them on their own.
+        """
+        if query_embedding is None:
+            query_embedding = self.rag_engine.encode([processed_query])[0]
+
+        similarities = session.similarities(query_embedding)
+        relevant = int(np.count_nonzero(similarities >= Config.RETRIEVAL_MIN_SIMILARITY))
+        if relevant >= Config.SESSION_FOLLOW_UP_MIN_RELEVANT:
+            return None
+        return 'Query must be related to quantum mechanics or quantum computing'
+
+    def answer_batch(self, queries: List[str]) -> List[Dict]:
+        """Answer many queries at once; results are returned in input order"""
+        results = list(self.iter_batch(queries))
+        results.sort(key=lambda item: item['index'])
+        return results
+
+    def iter_batch(self, queries: List[str]) -> Iterator[Dict]:
+        """Answer many queries, yielding each result (tagged with 'index') as soon as it is ready.
+
+        Cached answers are served first. Queries that normalise to the same text
+        share one fetch, one retrieval and one generated answer; documents are
+        de-duplicated across the whole batch and embedded together with all
+        queries, and every query is scored with a single matrix multiply.
+        """
+        logger.info('[RAG BATCH] %s queries', len(queries))
+
+        # Step 1: serve cached answers, validate the rest and group them by cache key
+        to_validate = []
+        for index, user_query in enumerate(queries):
+            response = self.cached_answer(user_query)
+            if response is not None:
+                response['index'] = index
+                yield response
+            else:
+                to_validate.append(index)
+
+        groups = {}
+        processed = {}
+        gate_embeddings = {}
+        validated = self.validate_batch([queries[index] for index in to_validate])
+        for index, (processed_query, error, query_embedding) in zip(to_validate, validated):
+            if error:
+                yield {'index': index, 'query': queries[index], 'error': error}
+                continue
+
+            key = processed_query.lower()
+            if key not in groups:
+                groups[key] = []
+                processed[key] = processed_query
+                gate_embeddings[key] = query_embedding
+            groups[key].append(index)
+
+        if not groups:
+            return
+
+        # Step 2: embed all distinct queries the gate did not already embed, in one batch
+        keys = list(groups)
+        missing = [key for key in keys if gate_embeddings[key] is None]
+        with metrics.stage('batch_embed_queries'):
+            encoded = self.rag_engine.encode([processed[key] for key in missing])
+        for key, embedding in zip(missing, encoded):
+            gate_embeddings[key] = embedding
+        query_embeddings = np.vstack([gate_embeddings[key] for key in keys])
+
+        # Step 3: fetch each distinct query once
+        logger.info('📚 Step 1: Fetching %s distinct queries...', len(keys))
+        fetched = {}
+        with metrics.stage('batch_fetch'), ThreadPoolExecutor(max_workers=Config.BATCH_FETCH_CONCURRENCY) as executor:
+            futures = {
+                executor.submit(self._safe_fetch, processed[key], gate_embeddings[key], True): key
+                for key in keys
+            }
+            for future in as_completed(futures):
+                fetched[futures[future]] = future.result()
+
+        # Step 4: de-duplicate documents across the batch
+        corpus = []
+        corpus_index = {}
+        candidates = {}
+
+        for key, (documents, _) in fetched.items():
+            doc_ids = []
+            for doc in documents:
+                doc_key = doc.key
+                if doc_key not in corpus_index:
+                    corpus_index[doc_key] = len(corpus)
+                    corpus.append(doc)
+                doc_ids.append(corpus_index[doc_key])
+            candidates[key] = np.unique(np.asarray(doc_ids, dtype=np.intp))
+
+        # Step 5: embed all documents in large batches and score with one matmul
+        logger.info('🔍 Step 2: Embedding %s documents...', len(corpus))
+        with metrics.stage('batch_embed_documents'):
+            _, doc_embeddings = self.rag_engine.build_index(corpus)
+        with metrics.stage('batch_vector_search'):
+            scores = query_embeddings @ doc_embeddings.T
+
+        retrieved = {}
+        for row, key in enumerate(keys):
+            doc_ids = candidates[key]
+            similarities = scores[row, doc_ids]
+            top = doc_ids[self.rag_engine.top_k_indices(similarities, Config.RETRIEVAL_TOP_K)]
+            retrieved[key] = self.rag_engine.collect(corpus, top)
+            self._record_outcome(fetched[key][1], retrieved[key])
+
+        # Step 6: generate one answer per distinct query with bounded LLM concurrency
+        logger.info('🤖 Step 3: Generating %s answers...', len(keys))
+        with ThreadPoolExecutor(max_workers=Config.BATCH_LLM_CONCURRENCY) as executor:
+            futures = {
+                executor.submit(self.rag_engine.generate_answer, processed[key], retrieved[key]): key
+                for key in keys
+            }
+
+            for future in as_completed(futures):
+                key = futures[future]
+                documents, counts = fetched[key]
+
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error('❌ Batch ERROR [%s]: %s', processed[key], e)
+                    for index in groups[key]:
+                        yield {'index': index, 'query': queries[index], 'error': str(e)}
+                    continue
+
+                for index in groups[key]:
+                    response = self._build_response(
+                        queries[index], result, counts, len(documents), len(retrieved[key])
+                    )
+                    if index == groups[key][0]:
+                        self._store(processed[key], response)
+                    response['index'] = index
+                    yield response
+
+        logger.info('✅ Batch complete!')
+
+    def _safe_fetch(self, query: str, query_embedding: np.ndarray = None,
+                    background: bool = False) -> Tuple[List[Document], Dict]:
+        try:
+            return self.fetch_documents(query, query_embedding, background)
+        except Exception as e:
+            logger.error("❌ Fetch error for '%s': %s", query, e)
+            return [], {'arxiv_count': 0, 'web_count': 0, 'query_class': None, 'sources_called': [],
+                        'sources_skipped': []}
+
+    @staticmethod
+    def _build_response(user_query: str, result: Dict, counts: Dict,
+                        total_docs: int, retrieved_count: int) -> Dict:
+        return {
+            'success': True,
+            'query': user_query,
+            'structured_answer': result['structured_answer'],
+            'sources': result['sources'],
+            'confidence': result['confidence'],
+            'debug': {
+                'arxiv_count': counts['arxiv_count'],
+                'web_count': counts['web_count'],
+                'total_docs': total_docs,
+                'retrieved_docs': retrieved_count,
+                'sources_called': counts['sources_called'],
+                'sources_skipped': counts['sources_skipped'],
+                'generated_by': result['generated_by'],
+                'degraded': result.get('degraded', False)
+            }
+        }
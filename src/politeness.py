@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+from typing import Tuple
+from src.file_lock import exclusive_lock
+
+
+class PolitenessQueueFull(Exception):
+    """The next free send slot is further away than the caller is willing to wait"""
+
+
+class PolitenessScheduler:
+    """Space out requests to one upstream across every worker process on the host.
+
+    Each caller reserves the next free send slot in a small shared file (under an
+    exclusive flock), then sleeps until that slot outside the lock. Reservations
+    further away than max_wait are refused so interactive callers can skip the
+    upstream instead of stalling. Background (batch and pre-warm) callers never
+    book further ahead than max_wait - min_interval; while the schedule is fuller
+    than that they sleep and retry for up to background_max_wait, so an
+    interactive caller's turn is always within max_wait however many background
+    callers are queued.
+    """
+
+    def __init__(self, path: str, min_interval: float, max_wait: float, background_max_wait: float = None):
+        self.path = path
+        self.min_interval = min_interval
+        self.max_wait = max_wait
+        self.background_max_wait = max_wait if background_max_wait is None else background_max_wait
+        self.background_max_ahead = max(0.0, max_wait - min_interval)
+        self._lock = threading.Lock()
+        self._local_next_slot = 0.0
+
+    def reserve(self, max_wait: float = None, background: bool = False) -> float:
+        """Reserve a send slot and return the delay until it, or -1 if it is too far away"""
+        max_wait = self.max_wait if max_wait is None else max_wait
+        if background:
+            max_wait = min(max_wait, self.background_max_ahead)
+        booked, delay = self._book(max_wait)
+        return delay if booked else -1
+
+    def wait_turn(self, max_wait: float = None, background: bool = False) -> bool:
+        """Block until this caller may send; False if the queue is too long to wait.
+
+        Background callers keep retrying for up to max_wait (default
+        background_max_wait) instead of booking a far-off slot.
+        """
+        if not background:
+            delay = self.reserve(max_wait)
+            if delay < 0:
+                return False
+            if delay > 0:
+                time.sleep(delay)
+            return True
+
+        give_up_at = time.monotonic() + (self.background_max_wait if max_wait is None else max_wait)
+        while True:
+            booked, delay = self._book(self.background_max_ahead)
+            if booked:
+                if delay > 0:
+                    time.sleep(delay)
+                return True
+
+            remaining = give_up_at - time.monotonic()
+            if remaining <= 0:
+                return False
+            # Sleep until the schedule has drained back within reach
+            time.sleep(min(remaining, max(delay - self.background_max_ahead, 0.05)))
+
+    def _book(self, max_wait: float) -> Tuple[bool, float]:
+        """(booked, delay until the next free slot); only books if the delay is within max_wait"""
+        # Without a cross-process lock (Windows), fall back to per-process scheduling
+        with self._lock, exclusive_lock(self.path) as fd:
+            if fd is None:
+                return self._book_local(max_wait)
+
+            raw = os.pread(fd, 64, 0)
+            try:
+                next_slot = float(raw.decode() or 0)
+            except ValueError:
+                next_slot = 0.0
+
+            now = time.time()
+            slot = max(now, next_slot)
+            delay = slot - now
+            if delay > max_wait:
+                return False, delay
+
+            record = f'{slot + self.min_interval:.6f}'.encode()
+            os.ftruncate(fd, 0)
+            os.pwrite(fd, record, 0)
+            return True, delay
+
+    def _book_local(self, max_wait: float) -> Tuple[bool, float]:
+        now = time.time()
+        slot = max(now, self._local_next_slot)
+        delay = slot - now
+        if delay > max_wait:
+            return False, delay
+        self._local_next_slot = slot + self.min_interval
+        return True, delay
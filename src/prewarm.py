@@ -0,0 +1,235 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+from config import Config
+from src import metrics
+from src.file_lock import exclusive_lock
+
+logger = logging.getLogger(__name__)
+
+
+class QueryPrewarmer:
+    """Keep answers to the most frequently asked queries warm in the AnswerCache.
+
+    Asks are counted per normalized query (the cache key) over a sliding
+    window. A background thread re-runs the pipeline for the top-N queries
+    whose cached answer is missing or about to expire, a few at a time, and
+    backs off whenever user requests are queueing for pipeline admission.
+    Counts are saved to disk so a fresh deploy starts warming immediately.
+
+    Caches are per process, so every gunicorn worker warms its own: the thread
+    is started lazily in each process that serves requests (never in a
+    preloading master), and each process keeps its own entry in the shared
+    state file, holding only the asks it recorded itself.
+    """
+
+    def __init__(self, pipeline, answer_cache, admission=None, state_file: str = None):
+        self.pipeline = pipeline
+        self.answer_cache = answer_cache
+        self.admission = admission
+        self.state_file = state_file or Config.PREWARM_STATE_FILE
+
+        # (timestamp, cache key, weight, own), oldest first; counts mirrors it and
+        # own_counts the asks recorded by this process (not loaded from the state file)
+        self._history = deque()
+        self._counts = Counter()
+        self._own_counts = Counter()
+        self._lock = threading.Lock()
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._thread_pid = None
+        self._start_lock = threading.Lock()
+        self._process_key = None
+        self._last_round = None
+
+        self._load_state()
+
+    def record(self, user_query: str):
+        """Count one ask of a query that passed the topic gate"""
+        self._add(self.pipeline.cache_key(user_query), 1, time.time())
+
+    def _add(self, key: str, weight: int, timestamp: float, own: bool = True):
+        if not key:
+            return
+        with self._lock:
+            if len(self._history) >= Config.PREWARM_HISTORY_SIZE:
+                self._forget(self._history.popleft())
+            self._history.append((timestamp, key, weight, own))
+            self._counts[key] += weight
+            if own:
+                self._own_counts[key] += weight
+
+    def _forget(self, event: Tuple[float, str, int, bool]):
+        _, key, weight, own = event
+        for counts in (self._counts, self._own_counts) if own else (self._counts,):
+            counts[key] -= weight
+            if counts[key] <= 0:
+                del counts[key]
+
+    def popular(self, limit: int) -> List[Tuple[str, int]]:
+        """Most asked queries within the window, with their ask counts"""
+        cutoff = time.time() - Config.PREWARM_WINDOW
+        with self._lock:
+            while self._history and self._history[0][0] < cutoff:
+                self._forget(self._history.popleft())
+            ranked = self._counts.most_common(limit)
+        return [(key, count) for key, count in ranked if count >= Config.PREWARM_MIN_ASKS]
+
+    @staticmethod
+    def in_quiet_hours(now: float = None) -> bool:
+        start, end = Config.PREWARM_QUIET_HOURS
+        hour = time.localtime(now).tm_hour
+        if start <= end:
+            return start <= hour < end
+        return hour >= start or hour < end
+
+    def due(self) -> List[str]:
+        """Popular queries whose cached answer is missing or expires before the next round is safely done"""
+        limit = Config.PREWARM_QUIET_TOP_N if self.in_quiet_hours() else Config.PREWARM_TOP_N
+        due = []
+        for key, _ in self.popular(limit):
+            remaining = self.answer_cache.remaining_ttl(key)
+            if remaining is None or remaining < Config.PREWARM_REFRESH_BEFORE:
+                due.append(key)
+        return due
+
+    def run_once(self) -> Dict[str, int]:
+        """Refresh every due query; returns how many were refreshed, skipped or failed"""
+        outcomes = Counter()
+        keys = self.due()
+        if not keys:
+            return dict(outcomes)
+
+        concurrency = 1 if self.in_quiet_hours() else Config.PREWARM_CONCURRENCY
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='prewarm') as pool:
+            for outcome in pool.map(self._refresh, keys):
+                outcomes[outcome] += 1
+                metrics.PREWARM_QUERIES.inc(result=outcome)
+
+        self._last_round = {'at': time.time(), 'due': len(keys), **outcomes}
+        logger.info('[Prewarm] Refreshed %s/%s popular queries', outcomes['refreshed'], len(keys))
+        return dict(outcomes)
+
+    def _refresh(self, key: str) -> str:
+        if self._stop.is_set():
+            return 'skipped'
+
+        # Never queue ahead of users: only use a pipeline slot that is free right now
+        if self.admission is not None and not self.admission.try_acquire():
+            return 'skipped'
+
+        start = time.monotonic()
+        try:
+            result = self.pipeline.answer(key, background=True)
+        except Exception as e:
+            logger.warning('[Prewarm] ⚠ Failed to refresh %r: %s', key, e)
+            return 'failed'
+        finally:
+            if self.admission is not None:
+                self.admission.release(time.monotonic() - start)
+
+        return 'failed' if 'error' in result else 'refreshed'
+
+    def start(self):
+        """Start warming in this process; cheap to call on every request.
+
+        Threads do not survive fork, so a thread started before gunicorn forks
+        its workers would only warm the master's cache.
+        """
+        if self._thread_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread_pid != os.getpid():
+                self._thread_pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='prewarm', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread_pid == os.getpid():
+            self._thread.join(timeout=5)
+        self._save_state()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+                self._save_state()
+            except Exception as e:
+                logger.warning('[Prewarm] ⚠ Round failed: %s', e)
+            self._stop.wait(Config.PREWARM_INTERVAL)
+
+    def _save_state(self):
+        """Write this process's counts into its own entry of the shared state file.
+
+        The read-merge-write runs under an exclusive lock so workers do not
+        overwrite each other; entries older than the window are dropped.
+        """
+        with self._lock:
+            counts = dict(self._own_counts.most_common(Config.PREWARM_TOP_N * 5))
+        if not counts:
+            return
+
+        if self._process_key is None or not self._process_key.startswith(f'{os.getpid()}-'):
+            self._process_key = f'{os.getpid()}-{uuid.uuid4().hex[:8]}'
+
+        directory = os.path.dirname(os.path.abspath(self.state_file))
+        try:
+            with exclusive_lock(self.state_file + '.lock'):
+                now = time.time()
+                processes = {key: entry for key, entry in self._read_state().items()
+                             if now - entry['saved_at'] < Config.PREWARM_WINDOW}
+                processes[self._process_key] = {'saved_at': now, 'counts': counts}
+
+                fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump({'processes': processes}, f)
+                os.replace(tmp_path, self.state_file)
+        except OSError as e:
+            logger.warning('[Prewarm] ⚠ Could not save query counts: %s', e)
+
+    def _read_state(self) -> Dict[str, Dict]:
+        """Per-process entries of the state file: {process key: {'saved_at', 'counts'}}"""
+        try:
+            with open(self.state_file, encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.debug('[Prewarm] No saved query counts: %s', e)
+            return {}
+
+        if 'processes' in state:
+            return state['processes']
+        # Single-entry format written by earlier versions
+        return {'legacy': state} if 'counts' in state and 'saved_at' in state else {}
+
+    def _load_state(self):
+        """Start from the summed counts of every process's saved entry, or from the seed queries"""
+        counts = Counter()
+        now = time.time()
+        for entry in self._read_state().values():
+            if now - entry.get('saved_at', 0) < Config.PREWARM_WINDOW:
+                counts.update({key: int(count) for key, count in entry.get('counts', {}).items()})
+
+        if not counts:
+            counts = {self.pipeline.cache_key(query): Config.PREWARM_MIN_ASKS
+                      for query in Config.PREWARM_SEED_QUERIES}
+
+        for key, count in counts.items():
+            self._add(key, count, now, own=False)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            tracked = len(self._counts)
+        return {
+            'tracked_queries': tracked,
+            'quiet_hours': self.in_quiet_hours(),
+            'last_round': self._last_round
+        }
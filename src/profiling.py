@@ -0,0 +1,133 @@
+"""Opt-in, per-request profiling of the RAG pipeline.
+
+A request is profiled when it carries an X-Profile header matching
+Config.PROFILE_TOKEN, or when it is picked by Config.PROFILE_SAMPLE_RATE. The
+request then runs under cProfile while pipeline stages record a span timeline;
+both are written to Config.PROFILE_DIR as <id>.pstats and <id>.speedscope.json.
+
+When no profile is active the only cost is one context-variable lookup per span.
+"""
+import cProfile
+import hmac
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('profile_session', default=None)
+
+
+class ProfileSession:
+    """cProfile data plus a stage span timeline for one request"""
+
+    def __init__(self, label: str):
+        self.profile_id = time.strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:8]
+        self.label = label
+        self.started = time.perf_counter()
+        self.spans = []
+        self.profile = cProfile.Profile()
+
+    def add_span(self, name: str, start: float, end: float):
+        self.spans.append((name, start, end))
+
+    def write(self, output_dir: str):
+        os.makedirs(output_dir, exist_ok=True)
+        base = os.path.join(output_dir, self.profile_id)
+
+        self.profile.dump_stats(base + '.pstats')
+        with open(base + '.speedscope.json', 'w', encoding='utf-8') as f:
+            json.dump(self._speedscope(), f)
+
+        logger.info('Profile %s written to %s.{pstats,speedscope.json}', self.profile_id, base)
+
+    def _speedscope(self) -> dict:
+        """Span timeline in speedscope's evented format (milliseconds from request start)"""
+        frames = []
+        frame_index = {}
+        events = []
+
+        for name, start, end in self.spans:
+            if name not in frame_index:
+                frame_index[name] = len(frames)
+                frames.append({'name': name})
+            frame = frame_index[name]
+            # Tie-breakers: outer spans open first, inner spans close first
+            events.append((start, 'O', frame, end))
+            events.append((end, 'C', frame, start))
+
+        # Closes sort before opens at the same instant
+        events.sort(key=lambda event: (event[0], event[1] == 'O', -event[3]))
+        end_value = max([end for _, _, end in self.spans], default=self.started)
+
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': self.label,
+            'exporter': 'quantum-chatbot',
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'evented',
+                'name': self.label,
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': (end_value - self.started) * 1000,
+                'events': [
+                    {'type': kind, 'frame': frame, 'at': (at - self.started) * 1000}
+                    for at, kind, frame, _ in events
+                ]
+            }]
+        }
+
+
+class Profiler:
+    """Decides which requests to profile and runs them under a ProfileSession"""
+
+    def __init__(self, output_dir: str, sample_rate: float = 0.0, token: Optional[str] = None):
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.token = token
+        # cProfile is per thread but costly; profile one request at a time
+        self._busy = threading.Lock()
+
+    def should_profile(self, header_value: Optional[str]) -> bool:
+        if header_value and self.token and hmac.compare_digest(header_value.encode(), self.token.encode()):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    @contextmanager
+    def maybe_profile(self, header_value: Optional[str], label: str = 'request'):
+        """Profile the block if the request is authorised or sampled; yields the session or None"""
+        if not self.should_profile(header_value) or not self._busy.acquire(blocking=False):
+            yield None
+            return
+
+        session = ProfileSession(label)
+        token = _current.set(session)
+        try:
+            session.profile.enable()
+            try:
+                yield session
+            finally:
+                session.profile.disable()
+                _current.reset(token)
+
+            try:
+                session.write(self.output_dir)
+            except OSError as e:
+                logger.warning('Could not write profile %s: %s', session.profile_id, e)
+        finally:
+            self._busy.release()
+
+
+def add_span(name: str, start: float, end: float):
+    """Record a span (perf_counter times) on the active profile, if any"""
+    session = _current.get()
+    if session is not None:
+        session.add_span(name, start, end)
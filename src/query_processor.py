@@ -1,12 +1,35 @@
 import re
+import threading
+from typing import Callable, List, Optional, Tuple
+import numpy as np
 from config import Config
 
 
 class QueryProcessor:
     """Process and validate user queries"""
 
-    def __init__(self):
+    def __init__(self, encoder: Optional[Callable[[List[str]], np.ndarray]] = None):
         self.quantum_keywords = Config.QUANTUM_KEYWORDS
+        self.ambiguous_keywords = Config.QUANTUM_AMBIGUOUS_KEYWORDS
+
+        # Stage 1: one compiled alternation per tier, matching whole words (plus plural/inflected endings)
+        self._keyword_pattern = self._compile(self.quantum_keywords)
+        self._ambiguous_pattern = self._compile(self.ambiguous_keywords)
+
+        # Stage 2: callable returning L2-normalised embeddings (e.g. RAGEngine.encode)
+        self.encoder = encoder
+        self._centroid = None
+        self._centroid_lock = threading.Lock()
+
+    # Endings a keyword may carry and still count as the same word ("qubits", "entangled",
+    # "shor's"); anything else, like "short" or "cirque", is a different word
+    KEYWORD_SUFFIX = r"(?:'s|s|es|d|ed|ing|ment|ments)?"
+
+    @classmethod
+    def _compile(cls, keywords: List[str]) -> re.Pattern:
+        # Longest first so multi-word terms win over their prefixes
+        alternation = '|'.join(re.escape(k) for k in sorted(keywords, key=len, reverse=True))
+        return re.compile(r'\b(?:' + alternation + ')' + cls.KEYWORD_SUFFIX + r'\b', re.IGNORECASE)
 
     def process(self, query: str) -> str:
         """Clean and process the query"""
@@ -20,7 +43,52 @@ class QueryProcessor:
 
     def is_quantum_related(self, query: str) -> bool:
         """Check if query is related to quantum topics"""
-        query_lower = query.lower()
+        return self.classify(query)[0]
+
+    def classify(self, query: str) -> Tuple[bool, Optional[np.ndarray]]:
+        """Two-stage topic gate.
+
+        Returns (is_related, query_embedding). The embedding is only computed
+        for queries that reach the second stage and is None otherwise, so the
+        caller can reuse it for retrieval instead of encoding the query again.
+        """
+        return self.classify_batch([query])[0]
+
+    def classify_batch(self, queries: List[str]) -> List[Tuple[bool, Optional[np.ndarray]]]:
+        """classify() for many queries; every query reaching stage 2 is embedded in one encoder call"""
+        results = [None] * len(queries)
+        to_embed = []
+
+        for i, query in enumerate(queries):
+            # Stage 1: unambiguous keyword accepts outright
+            if self._keyword_pattern.search(query):
+                results[i] = (True, None)
+                continue
+
+            ambiguous = self._ambiguous_pattern.search(query) is not None
+
+            # Without an encoder, fall back to the keyword decision
+            if self.encoder is None:
+                results[i] = (ambiguous, None)
+            else:
+                to_embed.append((i, ambiguous))
+
+        if to_embed:
+            # Stage 2: similarity to the quantum topic centroid
+            embeddings = self.encoder([queries[i] for i, _ in to_embed])
+            centroid = self._topic_centroid()
+            for (i, ambiguous), embedding in zip(to_embed, embeddings):
+                similarity = float(np.dot(embedding, centroid))
+                threshold = Config.QUANTUM_TOPIC_THRESHOLD if ambiguous else Config.QUANTUM_TOPIC_STRICT_THRESHOLD
+                results[i] = (similarity >= threshold, embedding)
+
+        return results
 
-        # Check if any quantum keyword is in the query
-        return any(keyword in query_lower for keyword in self.quantum_keywords)
\ No newline at end of file
+    def _topic_centroid(self) -> np.ndarray:
+        if self._centroid is None:
+            with self._centroid_lock:
+                if self._centroid is None:
+                    seeds = self.encoder(Config.QUANTUM_TOPIC_SEEDS)
+                    centroid = np.asarray(seeds).mean(axis=0)
+                    self._centroid = centroid / np.linalg.norm(centroid)
+        return self._centroid
@@ -1,110 +1,140 @@
-from typing import List, Dict
+import logging
+from typing import List, Dict, Tuple
 import os
 from sentence_transformers import SentenceTransformer
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 from groq import Groq
 import re
+import time
+from contextlib import nullcontext
+from config import Config
+from src import metrics, profiling
+from src.admission import AdmissionRejected
+from src.document import Document
+
+logger = logging.getLogger(__name__)
 
 
 class RAGEngine:
     """Simple RAG Engine without ChromaDB - No compilation needed!"""
 
     def __init__(self, groq_api_key: str = None):
-        print("[RAG] Loading embedding model...")
-        self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
+        logger.info('[RAG] Loading embedding model...')
+        self.embedder = SentenceTransformer(Config.EMBEDDING_MODEL)
 
         self.documents = []
         self.embeddings = []
 
+        # Optional AdmissionController capping concurrent Groq calls
+        self.llm_limiter = None
+
         self.groq_api_key = groq_api_key or os.getenv('GROQ_API_KEY')
 
         if self.groq_api_key:
             try:
-                self.groq_client = Groq(api_key=self.groq_api_key)
+                self.groq_client = Groq(api_key=self.groq_api_key, base_url=Config.GROQ_BASE_URL)
                 self.llm_available = True
                 self.model_name = "llama-3.3-70b-versatile"
-                print(f"[RAG] ✓ Groq LLM ready (model: {self.model_name})")
+                logger.info('[RAG] ✓ Groq LLM ready (model: %s)', self.model_name)
             except Exception as e:
-                print(f"[RAG] ⚠ Groq init error: {e}")
+                logger.warning('[RAG] ⚠ Groq init error: %s', e)
                 self.llm_available = False
                 self.model_name = None
         else:
             self.groq_client = None
             self.llm_available = False
             self.model_name = None
-            print("[RAG] ⚠ No GROQ_API_KEY found")
+            logger.warning('[RAG] ⚠ No GROQ_API_KEY found')
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Embed texts as L2-normalised vectors so a dot product is cosine similarity"""
+        if not texts:
+            dim = self.embedder.get_sentence_embedding_dimension()
+            return np.zeros((0, dim), dtype=np.float32)
+
+        return self.embedder.encode(
+            texts,
+            batch_size=Config.EMBEDDING_BATCH_SIZE,
+            show_progress_bar=False,
+            normalize_embeddings=True
+        )
+
+    def build_index(self, documents: List[Document]) -> Tuple[List[Document], np.ndarray]:
+        """Embeddings for documents without touching engine state; the documents themselves are the index entries.
+
+        Documents that already carry an embedding (e.g. from the knowledge base)
+        are not re-encoded.
+        """
+        to_encode = [i for i, doc in enumerate(documents) if doc.embedding is None]
+        encoded = self.encode([documents[i].text for i in to_encode])
+        if len(to_encode) == len(documents):
+            return documents, encoded
+
+        embeddings = np.empty((len(documents), encoded.shape[1]), dtype=np.float32)
+        embeddings[to_encode] = encoded
+        for i, doc in enumerate(documents):
+            if doc.embedding is not None:
+                embeddings[i] = doc.embedding
+
+        return documents, embeddings
+
+    @staticmethod
+    def top_k_indices(similarities: np.ndarray, top_k: int) -> np.ndarray:
+        """Indices of the top_k highest similarities, best first"""
+        if similarities.size <= top_k:
+            return np.argsort(similarities)[::-1]
 
-    def add_documents(self, documents: List[Dict]):
+        candidates = np.argpartition(similarities, -top_k)[-top_k:]
+        return candidates[np.argsort(similarities[candidates])[::-1]]
+
+    @staticmethod
+    def collect(entries: List[Document], indices: np.ndarray) -> List[Document]:
+        """The indexed documents at the ranked indices, best first"""
+        return [entries[idx] for idx in indices]
+
+    def add_documents(self, documents: List[Document]):
         if not documents:
             return
 
-        self.documents = []
-        texts = []
+        logger.debug('[RAG] Generating embeddings...')
+        self.documents, self.embeddings = self.build_index(documents)
+        logger.debug('[RAG] ✓ Indexed %s documents', len(documents))
 
-        for i, doc in enumerate(documents):
-            text = f"{doc['title']}. {doc['snippet']}"
-            texts.append(text)
-
-            self.documents.append({
-                'id': i,
-                'text': text,
-                'metadata': {
-                    'title': doc['title'],
-                    'link': doc['link'],
-                    'source': doc.get('source_type', doc.get('source', 'Unknown'))
-                }
-            })
-
-        print("[RAG] Generating embeddings...")
-        self.embeddings = self.embedder.encode(texts, show_progress_bar=False)
-        print(f"[RAG] ✓ Indexed {len(documents)} documents")
-
-    def retrieve(self, query: str, top_k: int = 8) -> List[Dict]:
+    def retrieve(self, query: str, top_k: int = 8) -> List[Document]:
         if not self.documents:
             return []
 
-        query_embedding = self.embedder.encode([query], show_progress_bar=False)
-        similarities = cosine_similarity(query_embedding, self.embeddings)[0]
-        top_indices = np.argsort(similarities)[::-1][:top_k]
+        query_embedding = self.encode([query])[0]
+        similarities = self.embeddings @ query_embedding
+        top_indices = self.top_k_indices(similarities, top_k)
 
-        retrieved_docs = []
-        for idx in top_indices:
-            retrieved_docs.append({
-                'text': self.documents[idx]['text'],
-                'metadata': self.documents[idx]['metadata'],
-                'similarity': float(similarities[idx])
-            })
+        retrieved_docs = self.collect(self.documents, top_indices)
 
-        print(f"[RAG] ✓ Retrieved {len(retrieved_docs)} relevant documents")
+        logger.debug('[RAG] ✓ Retrieved %s relevant documents', len(retrieved_docs))
         return retrieved_docs
 
-    def generate_answer(self, query: str, retrieved_docs: List[Dict]) -> Dict:
+    def generate_answer(self, query: str, retrieved_docs: List[Document], history: str = '') -> Dict:
         if self.llm_available:
-            return self._generate_with_groq(query, retrieved_docs)
+            return self._generate_with_groq(query, retrieved_docs, history)
         else:
             return self._generate_template_based(query, retrieved_docs)
 
-    def _generate_with_groq(self, query: str, retrieved_docs: List[Dict]) -> Dict:
-        """Generate answer using Groq cloud LLM"""
+    def _generate_with_groq(self, query: str, retrieved_docs: List[Document], history: str = '') -> Dict:
+        """Generate answer using Groq cloud LLM; history is the compacted conversation so far"""
 
         context_parts = []
         sources = []
 
         for i, doc in enumerate(retrieved_docs[:6], 1):
-            source_name = doc['metadata']['source']
-            context_parts.append(f"[Source {i} - {source_name}]\n{doc['text'][:600]}")
-            sources.append({
-                'title': doc['metadata']['title'],
-                'link': doc['metadata']['link'],
-                'type': source_name
-            })
+            context_parts.append(f"[Source {i} - {doc.source}]\n{doc.title}. {doc.snippet[:600]}")
+            sources.append(doc.as_source())
 
         context = "\n\n".join(context_parts)
+        conversation = f"Conversation so far:\n{history}\n\n" if history else ""
 
         prompt = f"""You are an expert quantum computing educator.
 
-Question: {query}
+{conversation}Question: {query}
 
 Sources:
 {context}
@@ -123,33 +153,45 @@ KEY PROPERTIES:
 Answer:"""
 
         try:
-            print(f"[RAG] 🤖 Generating with Groq ({self.model_name})...")
+            logger.debug('[RAG] 🤖 Generating with Groq (%s)...', self.model_name)
+
+            with self.llm_limiter.slot() if self.llm_limiter else nullcontext():
+                start = time.perf_counter()
+                stream = self.groq_client.chat.completions.create(
+                    model=self.model_name,
+                    messages=[
+                        {"role": "system", "content": "You are a quantum physics expert."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.7,
+                    max_tokens=1500,
+                    top_p=0.9,
+                    stream=True
+                )
 
-            response = self.groq_client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "system", "content": "You are a quantum physics expert."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=1500,
-                top_p=0.9
-            )
+                # Stream so time-to-first-token can be measured separately from total time
+                parts = []
+                for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        if not parts:
+                            metrics.LLM_SECONDS.observe(time.perf_counter() - start, phase='ttft')
+                        parts.append(delta)
 
-            if not response or not hasattr(response, 'choices') or not response.choices:
-                print("[RAG] ⚠ Invalid response from Groq")
-                return self._generate_template_based(query, retrieved_docs)
+                end = time.perf_counter()
+                metrics.LLM_SECONDS.observe(end - start, phase='total')
+                profiling.add_span('llm', start, end)
 
-            answer_text = response.choices[0].message.content
+            answer_text = ''.join(parts)
 
             if not answer_text:
-                print("[RAG] ⚠ Empty answer from Groq")
-                return self._generate_template_based(query, retrieved_docs)
+                logger.warning('[RAG] ⚠ Empty answer from Groq')
+                return self._generate_fallback(query, retrieved_docs)
 
             # Parse answer
             structured = self._parse_llm_answer(answer_text, sources)
 
-            print(f"[RAG] ✓ Answer generated ({len(answer_text)} chars)")
+            logger.debug('[RAG] ✓ Answer generated (%s chars)', len(answer_text))
 
             return {
                 'structured_answer': structured,
@@ -158,11 +200,23 @@ Answer:"""
                 'generated_by': f'Groq AI ({self.model_name})'
             }
 
+        except AdmissionRejected as e:
+            # Overload, not a Groq failure; counted by the limiter's rejection metric
+            logger.warning('[RAG] ⚠ LLM busy, using template answer: %s', e)
+            return self._generate_fallback(query, retrieved_docs)
+
         except Exception as e:
-            print(f"[RAG] ⚠ Groq error: {type(e).__name__}: {e}")
-            return self._generate_template_based(query, retrieved_docs)
+            metrics.UPSTREAM_ERRORS.inc(source='Groq')
+            logger.warning('[RAG] ⚠ Groq error: %s: %s', type(e).__name__, e)
+            return self._generate_fallback(query, retrieved_docs)
 
-    def _generate_template_based(self, query: str, retrieved_docs: List[Dict]) -> Dict:
+    def _generate_fallback(self, query: str, retrieved_docs: List[Document]) -> Dict:
+        """Template answer standing in for a failed LLM call; marked degraded so it is not cached"""
+        result = self._generate_template_based(query, retrieved_docs)
+        result['degraded'] = True
+        return result
+
+    def _generate_template_based(self, query: str, retrieved_docs: List[Document]) -> Dict:
         if not retrieved_docs:
             return {
                 'structured_answer': None,
@@ -172,26 +226,21 @@ Answer:"""
             }
 
         best_doc = retrieved_docs[0]
-        main_text = best_doc['text'][:800]
+        main_text = f'{best_doc.title}. {best_doc.snippet[:800]}'
 
         properties = []
         sources = []
         source_types_seen = set()
 
         for doc in retrieved_docs[:10]:
-            metadata = doc['metadata']
-            source_type = metadata['source']
-
-            sources.append({
-                'title': metadata['title'],
-                'link': metadata['link'],
-                'type': source_type
-            })
+            source_type = doc.source
+            sources.append(doc.as_source())
 
-            if doc != retrieved_docs[0]:
+            if doc is not best_doc:
                 if source_type not in source_types_seen or len(properties) < 4:
-                    sentences = doc['text'].split('. ')
-                    prop_text = '. '.join(sentences[:3])
+                    # The title is the first sentence; only the snippet's first two are needed
+                    sentences = doc.snippet.split('. ', 2)
+                    prop_text = '. '.join([doc.title, *sentences[:2]])
                     if not prop_text.endswith('.'):
                         prop_text += '.'
 
@@ -199,8 +248,8 @@ Answer:"""
                         properties.append({
                             'content': prop_text[:600],
                             'source': source_type,
-                            'source_link': metadata['link'],
-                            'source_title': metadata['title']
+                            'source_link': doc.link,
+                            'source_title': doc.title
                         })
                         source_types_seen.add(source_type)
 
@@ -210,9 +259,9 @@ Answer:"""
         structured = {
             'main': {
                 'content': main_text,
-                'source': best_doc['metadata']['source'],
-                'source_link': best_doc['metadata']['link'],
-                'source_title': best_doc['metadata']['title']
+                'source': best_doc.source,
+                'source_link': best_doc.link,
+                'source_title': best_doc.title
             },
             'properties': properties
         }
@@ -1,6 +1,11 @@
+import logging
 import requests
-from typing import List, Dict, Optional
+from typing import List, Optional
 from config import Config
+from src import metrics
+from src.document import Document
+
+logger = logging.getLogger(__name__)
 
 
 class SerpAPISearcher:
@@ -8,13 +13,13 @@ class SerpAPISearcher:
 
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or Config.SERPAPI_KEY
-        self.base_url = "https://serpapi.com/search"
+        self.base_url = Config.SERPAPI_URL
 
     def is_configured(self) -> bool:
         """Check if API key is configured"""
         return bool(self.api_key)
 
-    def search(self, query: str) -> List[Dict]:
+    def search(self, query: str) -> List[Document]:
         """Search using SerpAPI"""
         if not self.is_configured():
             return []
@@ -37,26 +42,27 @@ class SerpAPISearcher:
 
             if 'organic_results' in results_data:
                 for result in results_data['organic_results']:
-                    results.append({
-                        'title': result.get('title', ''),
-                        'snippet': result.get('snippet', ''),
-                        'link': result.get('link', ''),
-                        'source': 'SerpAPI',
-                        'position': result.get('position', 0)
-                    })
+                    results.append(Document(
+                        result.get('title', ''),
+                        result.get('snippet', ''),
+                        result.get('link', ''),
+                        source='SerpAPI',
+                        origin='SerpAPI'
+                    ))
 
             if 'knowledge_graph' in results_data:
                 kg = results_data['knowledge_graph']
-                results.append({
-                    'title': kg.get('title', ''),
-                    'snippet': kg.get('description', ''),
-                    'link': kg.get('website', ''),
-                    'source': 'SerpAPI-KnowledgeGraph',
-                    'type': 'knowledge_graph'
-                })
+                results.append(Document(
+                    kg.get('title', ''),
+                    kg.get('description', ''),
+                    kg.get('website', ''),
+                    source='SerpAPI-KnowledgeGraph',
+                    origin='SerpAPI'
+                ))
 
             return results
 
         except Exception as e:
-            print(f"SerpAPI search error: {e}")
+            metrics.UPSTREAM_ERRORS.inc(source='SerpAPI')
+            logger.warning('SerpAPI search error: %s', e)
             return []
\ No newline at end of file
@@ -0,0 +1,133 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import numpy as np
+from config import Config
+from src.document import Document
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (about four characters per token for English)"""
+    return len(text) // 4 + 1
+
+
+class ConversationSession:
+    """One conversation: its turns plus the documents retrieved so far and their embeddings"""
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.turns = []
+        self.turn_count = 0
+        self.entries = []
+        self.embeddings = None
+        self._doc_keys = set()
+        # Turns of one conversation run one at a time
+        self.lock = threading.Lock()
+
+    def contextualize(self, query: str) -> str:
+        """Retrieval text for a turn: follow-ups like "and how is it measured?" borrow the previous question"""
+        if not self.turns:
+            return query
+        return f"{self.turns[-1]['question']} {query}"
+
+    def similarities(self, query_embedding: np.ndarray) -> np.ndarray:
+        if self.embeddings is None:
+            return np.zeros(0, dtype=np.float32)
+        return self.embeddings @ query_embedding
+
+    def add_documents(self, entries: List[Document], embeddings: np.ndarray):
+        """Add newly retrieved documents, skipping ones already held and dropping the oldest over the cap"""
+        keep = []
+        for row, entry in enumerate(entries):
+            key = entry.key
+            if key not in self._doc_keys:
+                self._doc_keys.add(key)
+                keep.append(row)
+
+        if not keep:
+            return
+
+        new_embeddings = np.asarray(embeddings[keep], dtype=np.float32)
+        self.entries.extend(entries[row] for row in keep)
+        self.embeddings = new_embeddings if self.embeddings is None else np.vstack([self.embeddings, new_embeddings])
+
+        overflow = len(self.entries) - Config.SESSION_MAX_DOCUMENTS
+        if overflow > 0:
+            for entry in self.entries[:overflow]:
+                self._doc_keys.discard(entry.key)
+            self.entries = self.entries[overflow:]
+            self.embeddings = self.embeddings[overflow:]
+
+    def add_turn(self, question: str, result: Dict):
+        structured = result.get('structured_answer') or {}
+        answer = (structured.get('main') or {}).get('content', '')
+        self.turns.append({'question': question, 'answer': answer})
+        self.turn_count += 1
+        del self.turns[:-Config.SESSION_MAX_TURNS]
+
+    def history(self, token_budget: int) -> str:
+        """Conversation so far, newest turns first to claim the budget.
+
+        The latest turn keeps its answer; older turns are compacted to their
+        question plus the answer's first sentence, and dropped once the budget
+        is spent.
+        """
+        lines = []
+        remaining = token_budget
+
+        for age, turn in enumerate(reversed(self.turns)):
+            answer = turn['answer'] if age == 0 else turn['answer'].split('. ')[0]
+            line = f"Q: {turn['question']}\nA: {answer}" if answer else f"Q: {turn['question']}"
+
+            cost = estimate_tokens(line)
+            if cost > remaining:
+                if age == 0 and remaining > 0:
+                    # Truncate rather than drop the latest turn
+                    lines.append(line[:remaining * 4])
+                break
+            lines.append(line)
+            remaining -= cost
+
+        return '\n'.join(reversed(lines))
+
+
+class SessionStore:
+    """Thread-safe, bounded LRU store of conversation sessions with an idle time-to-live"""
+
+    def __init__(self, max_sessions: int = None, ttl: float = None):
+        self.max_sessions = max_sessions or Config.SESSION_MAX_SESSIONS
+        self.ttl = ttl or Config.SESSION_TTL
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self) -> ConversationSession:
+        session = ConversationSession(secrets.token_urlsafe(16))
+        with self._lock:
+            self._sessions[session.session_id] = (time.time(), session)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session
+
+    def get(self, session_id: str) -> Optional[ConversationSession]:
+        """Return the session and mark it used, or None if unknown or idle past the TTL"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+
+            last_used, session = entry
+            if time.time() - last_used > self.ttl:
+                del self._sessions[session_id]
+                return None
+
+            self._sessions[session_id] = (time.time(), session)
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def get_or_create(self, session_id: Optional[str]) -> ConversationSession:
+        return (self.get(session_id) if session_id else None) or self.create()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -0,0 +1,125 @@
+import random
+import re
+import threading
+from collections import defaultdict, deque
+from typing import List, Dict, Iterable
+from config import Config
+from src.document import Document
+
+
+class SourceSelector:
+    """Decide which upstream sources to call, based on how often each one's documents
+    reach the final retrieved context and what it costs in latency and money"""
+
+    QUERY_CLASSES = [
+        ('research', re.compile(r'\b(latest|recent|research|paper|papers|arxiv|experiment|2\d{3})\b')),
+        ('how', re.compile(r'^(how|why)\b')),
+        ('comparison', re.compile(r'\b(vs|versus|difference|compare|compared)\b')),
+        ('definition', re.compile(r'^(what|define|explain|describe|who)\b')),
+    ]
+
+    def __init__(self, exploration_rate: float = None, min_samples: int = None,
+                 min_utility: float = None, latency_weight: float = None,
+                 costs: Dict[str, float] = None, window: int = None):
+        self.exploration_rate = Config.SOURCE_EXPLORATION_RATE if exploration_rate is None else exploration_rate
+        self.min_samples = Config.SOURCE_MIN_SAMPLES if min_samples is None else min_samples
+        self.min_utility = Config.SOURCE_MIN_UTILITY if min_utility is None else min_utility
+        self.latency_weight = Config.SOURCE_LATENCY_WEIGHT if latency_weight is None else latency_weight
+        self.costs = Config.SOURCE_COSTS if costs is None else costs
+        window = Config.SOURCE_STATS_WINDOW if window is None else window
+
+        self._lock = threading.Lock()
+        # (query_class, source) -> recent booleans: did the source contribute to the top-k?
+        self._contributions = defaultdict(lambda: deque(maxlen=window))
+        # source -> recent call latencies in seconds
+        self._latencies = defaultdict(lambda: deque(maxlen=window))
+        self._errors = defaultdict(int)
+        self._calls = defaultdict(int)
+        self._skipped = defaultdict(int)
+
+    def classify(self, query: str) -> str:
+        """Coarse query class used to keep separate statistics per kind of question"""
+        query_lower = query.lower()
+        for name, pattern in self.QUERY_CLASSES:
+            if pattern.search(query_lower):
+                return name
+        return 'other'
+
+    def select(self, query_class: str, available: Iterable[str]) -> List[str]:
+        """Return the sources worth calling for this query class"""
+        available = list(available)
+        selected = []
+        best_source, best_value = None, None
+
+        with self._lock:
+            for source in available:
+                history = self._contributions[(query_class, source)]
+
+                # Not enough evidence yet: keep calling it
+                if len(history) < self.min_samples:
+                    selected.append(source)
+                    continue
+
+                value = self._value(source, history)
+                if best_value is None or value > best_value:
+                    best_source, best_value = source, value
+
+                if value >= self.min_utility or random.random() < self.exploration_rate:
+                    selected.append(source)
+                else:
+                    self._skipped[source] += 1
+
+            # Never skip everything: fall back to the most useful source
+            if not selected and best_source is not None:
+                selected.append(best_source)
+                self._skipped[best_source] -= 1
+
+        return selected
+
+    def record_call(self, source: str, seconds: float, error: bool = False):
+        with self._lock:
+            self._calls[source] += 1
+            self._latencies[source].append(seconds)
+            if error:
+                self._errors[source] += 1
+
+    def record_outcome(self, query_class: str, called: Iterable[str], retrieved_docs: List[Document]):
+        """Record which of the called sources ended up in the retrieved context"""
+        used = {doc.origin for doc in retrieved_docs}
+        with self._lock:
+            for source in called:
+                self._contributions[(query_class, source)].append(source in used)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            sources = {}
+            for source, latencies in self._latencies.items():
+                sources[source] = {
+                    'calls': self._calls[source],
+                    'skipped': self._skipped[source],
+                    'errors': self._errors[source],
+                    'p50_ms': round(self._percentile(latencies, 50) * 1000, 1),
+                    'p90_ms': round(self._percentile(latencies, 90) * 1000, 1),
+                    'p99_ms': round(self._percentile(latencies, 99) * 1000, 1)
+                }
+
+            utility = defaultdict(dict)
+            for (query_class, source), history in self._contributions.items():
+                if history:
+                    utility[query_class][source] = round(sum(history) / len(history), 3)
+
+            return {'sources': sources, 'utility': dict(utility)}
+
+    def _value(self, source: str, history: deque) -> float:
+        """Contribution rate net of per-call cost and p90 latency"""
+        contribution_rate = sum(history) / len(history)
+        latency = self._percentile(self._latencies[source], 90)
+        return contribution_rate - self.costs.get(source, 0.0) - self.latency_weight * latency
+
+    @staticmethod
+    def _percentile(values: Iterable[float], percentile: float) -> float:
+        ordered = sorted(values)
+        if not ordered:
+            return 0.0
+        index = min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))
+        return ordered[index]
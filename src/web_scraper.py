@@ -1,13 +1,21 @@
+import logging
 import requests
 from bs4 import BeautifulSoup
-from typing import List, Dict
+from typing import List
 import urllib.parse
+from config import Config
+from src import metrics
+from src.document import Document
+
+logger = logging.getLogger(__name__)
 
 
 class WebScraper:
     """Scrape web results without API keys"""
 
-    def __init__(self):
+    def __init__(self, knowledge_base=None):
+        # Offline curated content (KnowledgeBase); searched by vector similarity
+        self.knowledge_base = knowledge_base
         self.headers = {
             'User-Agent': 'QuantumChatBot/1.0 (Educational Research)',
             'Accept': 'application/json, text/html',
@@ -17,7 +25,7 @@ class WebScraper:
     def get_wikipedia_extract(self, title: str) -> str:
         """Get the summary/extract from a Wikipedia article"""
         try:
-            api_url = "https://en.wikipedia.org/w/api.php"
+            api_url = Config.WIKIPEDIA_API_URL
             params = {
                 'action': 'query',
                 'format': 'json',
@@ -48,12 +56,12 @@ class WebScraper:
         except Exception as e:
             return f"Wikipedia article about {title}"
 
-    def search_wikipedia(self, query: str) -> List[Dict]:
+    def search_wikipedia(self, query: str, query_embedding=None) -> List[Document]:
         """Search Wikipedia and get actual article content"""
         try:
             clean_query = query.replace('?', '').replace('!', '').strip()
 
-            search_url = "https://en.wikipedia.org/w/api.php"
+            search_url = Config.WIKIPEDIA_API_URL
             params = {
                 'action': 'opensearch',
                 'search': clean_query,
@@ -80,129 +88,57 @@ class WebScraper:
                     if title and link:
                         extract = self.get_wikipedia_extract(title)
 
-                        results.append({
-                            'title': title,
-                            'snippet': extract,
-                            'link': link,
-                            'source': 'Wikipedia'
-                        })
+                        results.append(Document(title, extract, link, source='Wikipedia', origin='Web'))
 
-            print(f"[WebScraper] Wikipedia: {len(results)} results")
+            logger.debug('[WebScraper] Wikipedia: %s results', len(results))
             return results
 
         except Exception as e:
-            print(f"[WebScraper] Wikipedia error: {e}")
-            return self._get_wikipedia_fallback(query)
-
-    def _get_wikipedia_fallback(self, query: str) -> List[Dict]:
-        """Return detailed Wikipedia quantum articles"""
-        query_lower = query.lower()
-        fallback_articles = []
-
-        if 'qubit' in query_lower:
-            fallback_articles.append({
-                'title': 'Qubit',
-                'snippet': 'In quantum computing, a qubit or quantum bit is a basic unit of quantum information—the quantum version of the classic binary bit physically realized with a two-state device. A qubit is a two-state quantum-mechanical system, one of the simplest quantum systems displaying the peculiarity of quantum mechanics. Examples include the spin of the electron in which the two levels can be taken as spin up and spin down; or the polarization of a single photon in which the two states can be taken to be the vertical polarization and the horizontal polarization. In a classical system, a bit would have to be in one state or the other. However, quantum mechanics allows the qubit to be in a coherent superposition of both states simultaneously, a property that is fundamental to quantum mechanics and quantum computing.',
-                'link': 'https://en.wikipedia.org/wiki/Qubit',
-                'source': 'Wikipedia'
-            })
-
-        if 'entangle' in query_lower:
-            fallback_articles.append({
-                'title': 'Quantum entanglement',
-                'snippet': 'Quantum entanglement is a phenomenon in quantum mechanics in which the quantum states of two or more objects are correlated, meaning the state of one object cannot be fully described without considering the other(s), even if the objects are spatially separated. This leads to correlations between observable physical properties. For example, it is possible to prepare two particles in a single quantum state such that when one is observed to be spin-up, the other one will always be observed to be spin-down and vice versa. The phenomenon is counter-intuitive because it seems to contradict the principle of locality. Albert Einstein famously derided entanglement as "spooky action at a distance."',
-                'link': 'https://en.wikipedia.org/wiki/Quantum_entanglement',
-                'source': 'Wikipedia'
-            })
-
-        if 'superposition' in query_lower:
-            fallback_articles.append({
-                'title': 'Quantum superposition',
-                'snippet': 'Quantum superposition is a fundamental principle of quantum mechanics that states that linear combinations of solutions to the Schrödinger equation are also solutions. In the quantum realm, particles can exist in multiple states simultaneously. This means a quantum system can be in a state that is a combination of multiple possible states until it is measured. For example, an electron in an atom can exist in a superposition of different energy levels. The famous Schrödinger\'s cat thought experiment illustrates this concept. Superposition is what allows quantum computers to process vast amounts of information in parallel.',
-                'link': 'https://en.wikipedia.org/wiki/Quantum_superposition',
-                'source': 'Wikipedia'
-            })
-
-        print(f"[WebScraper] Wikipedia Fallback: {len(fallback_articles)} results")
+            metrics.UPSTREAM_ERRORS.inc(source='Wikipedia')
+            logger.warning('[WebScraper] Wikipedia error: %s', e)
+            return self._get_wikipedia_fallback(query, query_embedding)
+
+    def _search_knowledge_base(self, query: str, collection: str, query_embedding=None) -> List[Document]:
+        if self.knowledge_base is None:
+            return []
+        return self.knowledge_base.search(query, collection=collection, query_embedding=query_embedding)
+
+    def _get_wikipedia_fallback(self, query: str, query_embedding=None) -> List[Document]:
+        """Return offline Wikipedia quantum articles closest to the query"""
+        fallback_articles = self._search_knowledge_base(query, 'wikipedia', query_embedding)
+
+        logger.debug('[WebScraper] Wikipedia Fallback: %s results', len(fallback_articles))
         return fallback_articles
 
-    def search_quantum_sites(self, query: str) -> List[Dict]:
+    def search_quantum_sites(self, query: str, query_embedding=None) -> List[Document]:
         """Get detailed results from quantum computing educational sites"""
-        results = []
-        query_lower = query.lower()
-
-        if any(word in query_lower for word in ['qubit', 'gate', 'circuit', 'algorithm', 'quantum']):
-            results.append({
-                'title': 'IBM Quantum Learning - Quantum Computing Basics',
-                'snippet': 'A qubit is a quantum bit, the counterpart in quantum computing to the binary digit or bit of classical computing. Just as a bit is the basic unit of information in a classical computer, a qubit is the basic unit of information in a quantum computer. Qubits can exist in a superposition of states, which means they can be in multiple states at once. This is different from classical bits which can only be in one state (0 or 1) at a time. When measured, a qubit will collapse to either 0 or 1, but before measurement it exists in a probabilistic combination of both. This quantum property, along with entanglement, enables quantum computers to process information in fundamentally new ways.',
-                'link': 'https://learning.quantum.ibm.com/',
-                'source': 'IBM Quantum'
-            })
-
-        if 'entangle' in query_lower:
-            results.append({
-                'title': 'IBM Quantum - Understanding Entanglement',
-                'snippet': 'Quantum entanglement is one of the most fascinating and counterintuitive phenomena in quantum mechanics. When two qubits become entangled, their quantum states become correlated in such a way that measuring one qubit instantly affects the state of the other, regardless of the distance between them. This "spooky action at a distance," as Einstein called it, is not due to any physical connection between the qubits, but rather a fundamental property of quantum mechanics. Entanglement is a crucial resource for quantum computing, enabling quantum algorithms to perform operations that would be impossible with classical bits. It\'s also essential for quantum communication protocols like quantum teleportation and quantum cryptography.',
-                'link': 'https://learning.quantum.ibm.com/course/basics-of-quantum-information/entanglement-in-action',
-                'source': 'IBM Quantum'
-            })
-
-        if 'qubit' in query_lower or 'algorithm' in query_lower:
-            results.append({
-                'title': 'Qiskit Textbook - Understanding Quantum Information',
-                'snippet': 'The Qiskit Textbook provides a comprehensive introduction to quantum computing. A qubit, or quantum bit, is represented mathematically as a vector in a two-dimensional complex vector space. The two computational basis states are usually denoted as |0⟩ and |1⟩. Any qubit state can be written as a linear combination (superposition) of these basis states: |ψ⟩ = α|0⟩ + β|1⟩, where α and β are complex numbers satisfying |α|² + |β|² = 1. The coefficients α and β represent probability amplitudes. When we measure the qubit, we get outcome 0 with probability |α|² and outcome 1 with probability |β|². This probabilistic nature is a key feature of quantum mechanics.',
-                'link': 'https://qiskit.org/learn/',
-                'source': 'Qiskit'
-            })
-
-        print(f"[WebScraper] Quantum Sites: {len(results)} results")
+        results = self._search_knowledge_base(query, 'sites', query_embedding)
+
+        logger.debug('[WebScraper] Quantum Sites: %s results', len(results))
         return results
 
-    def get_quantum_facts(self, query: str) -> List[Dict]:
+    def get_quantum_facts(self, query: str, query_embedding=None) -> List[Document]:
         """Return detailed quantum computing facts"""
-        query_lower = query.lower()
-
-        quantum_knowledge = {
-            'qubit': {
-                'title': 'What is a Qubit? - Quantum Computing Fundamentals',
-                'snippet': 'A qubit (quantum bit) is the fundamental unit of quantum information and the quantum analog of the classical binary bit. Unlike classical bits that must be either 0 or 1, qubits can exist in a quantum superposition of both states simultaneously. This is mathematically represented as |ψ⟩ = α|0⟩ + β|1⟩, where α and β are complex probability amplitudes. When measured, a qubit collapses to either 0 (with probability |α|²) or 1 (with probability |β|²). Physically, qubits can be implemented using various quantum systems: electron spin (spin-up or spin-down), photon polarization (horizontal or vertical), superconducting circuits (current flowing clockwise or counterclockwise), or trapped ions (different energy levels). The power of quantum computing comes from three key qubit properties: superposition (being in multiple states at once), entanglement (correlations between qubits that have no classical equivalent), and interference (probability amplitudes combining constructively or destructively).',
-                'link': 'https://en.wikipedia.org/wiki/Qubit',
-                'source': 'Quantum Knowledge Base'
-            },
-            'entangle': {
-                'title': 'Quantum Entanglement Explained',
-                'snippet': 'Quantum entanglement is a physical phenomenon that occurs when pairs or groups of particles interact in ways such that the quantum state of each particle cannot be described independently. Instead, a quantum state must be described for the system as a whole. When particles are entangled, measurement of one particle\'s properties will instantly affect the properties of the other particle(s), regardless of the distance separating them. This was famously described by Einstein as "spooky action at a distance." For example, if two electrons are entangled with opposite spins, measuring one electron as spin-up will instantaneously cause the other to be spin-down. Entanglement is not caused by any physical connection or signal between particles; it\'s a fundamental feature of quantum mechanics. It enables quantum teleportation, quantum cryptography, and provides computational advantages in quantum algorithms.',
-                'link': 'https://en.wikipedia.org/wiki/Quantum_entanglement',
-                'source': 'Quantum Knowledge Base'
-            }
-        }
-
-        results = []
-        for keyword, info in quantum_knowledge.items():
-            if keyword in query_lower:
-                results.append(info)
-
-        if not results and 'quantum' in query_lower:
-            results.append(quantum_knowledge['qubit'])
+        results = self._search_knowledge_base(query, 'facts', query_embedding)
 
-        print(f"[WebScraper] Knowledge Base: {len(results)} results")
+        logger.debug('[WebScraper] Knowledge Base: %s results', len(results))
         return results
 
-    def search_all(self, query: str) -> List[Dict]:
+    def search_all(self, query: str, query_embedding=None) -> List[Document]:
         """Search all available sources"""
         results = []
 
         # Get comprehensive quantum facts
-        knowledge_results = self.get_quantum_facts(query)
+        knowledge_results = self.get_quantum_facts(query, query_embedding)
         results.extend(knowledge_results)
 
         # Wikipedia with actual content
-        wiki_results = self.search_wikipedia(query)
+        wiki_results = self.search_wikipedia(query, query_embedding)
         results.extend(wiki_results)
 
         # Educational sites
-        quantum_sites = self.search_quantum_sites(query)
+        quantum_sites = self.search_quantum_sites(query, query_embedding)
         results.extend(quantum_sites)
 
-        print(f"[WebScraper] TOTAL: {len(results)} web results")
+        logger.debug('[WebScraper] TOTAL: %s web results', len(results))
         return results
\ No newline at end of file
@@ -1,11 +1,110 @@
+// Answers are kept in the browser as long as the server caches them (Config.ANSWER_CACHE_TTL)
+const ANSWER_CACHE_TTL_MS = 60 * 60 * 1000;
+const ANSWER_CACHE_MAX_ENTRIES = 200;
+
+// Same normalisation as the server's answer cache key (QueryProcessor.process + lower)
+function normalizeQuery(query) {
+    return query
+        .split(/\s+/).join(' ')
+        .replace(/[^\p{L}\p{N}_\s?\-]/gu, '')
+        .trim()
+        .toLowerCase();
+}
+
+// Same rule as QueryPipeline._store: degraded answers and answers missing a skipped source are not kept
+function isCacheable(data) {
+    const debug = data.debug || {};
+    return !debug.degraded && !(debug.sources_skipped && debug.sources_skipped.length);
+}
+
+// IndexedDB store of recent answers; every method resolves (to null on failure) so the UI never depends on it
+function createAnswerCache() {
+    const dbPromise = new Promise((resolve) => {
+        if (!('indexedDB' in window)) return resolve(null);
+
+        const request = indexedDB.open('quantum-chatbot', 1);
+        request.onupgradeneeded = () => {
+            const store = request.result.createObjectStore('answers', { keyPath: 'key' });
+            store.createIndex('storedAt', 'storedAt');
+        };
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => resolve(null);
+    });
+
+    function run(mode, action) {
+        return dbPromise.then((db) => new Promise((resolve) => {
+            if (!db) return resolve(null);
+            try {
+                const tx = db.transaction('answers', mode);
+                const request = action(tx.objectStore('answers'));
+                tx.oncomplete = () => resolve(request ? request.result : null);
+                tx.onerror = tx.onabort = () => resolve(null);
+            } catch (error) {
+                resolve(null);
+            }
+        }));
+    }
+
+    // Drop expired entries, then the oldest beyond the size cap
+    function prune() {
+        return run('readwrite', (store) => {
+            const cutoff = Date.now() - ANSWER_CACHE_TTL_MS;
+            let excess = null;
+            const countRequest = store.count();
+            countRequest.onsuccess = () => {
+                excess = countRequest.result - ANSWER_CACHE_MAX_ENTRIES;
+                store.index('storedAt').openCursor().onsuccess = (event) => {
+                    const cursor = event.target.result;
+                    if (!cursor) return;
+                    if (cursor.value.storedAt < cutoff || excess > 0) {
+                        cursor.delete();
+                        excess -= 1;
+                        cursor.continue();
+                    }
+                };
+            };
+            return null;
+        });
+    }
+
+    prune();
+
+    return {
+        async get(key) {
+            const entry = await run('readonly', (store) => store.get(key));
+            if (!entry) return null;
+            if (Date.now() - entry.storedAt > ANSWER_CACHE_TTL_MS) {
+                run('readwrite', (store) => store.delete(key));
+                return null;
+            }
+            return entry.response;
+        },
+        put(key, response) {
+            return run('readwrite', (store) => store.put({ key, response, storedAt: Date.now() }))
+                .then(prune);
+        }
+    };
+}
+
+if ('serviceWorker' in navigator) {
+    window.addEventListener('load', () => {
+        navigator.serviceWorker.register('/sw.js').catch((error) => {
+            console.warn('Service worker registration failed:', error);
+        });
+    });
+}
+
 document.addEventListener('DOMContentLoaded', () => {
     const queryForm = document.getElementById('query-form');
     const queryInput = document.getElementById('query-input');
-    const sendButton = document.getElementById('send-button');
     const sendText = document.getElementById('send-text');
     const loadingSpinner = document.getElementById('loading-spinner');
     const chatMessages = document.getElementById('chat-messages');
 
+    const answerCache = createAnswerCache();
+    // Normalized query -> AbortController of its in-flight request
+    const inflight = new Map();
+
     // Focus input on load
     queryInput.focus();
 
@@ -15,35 +114,61 @@ document.addEventListener('DOMContentLoaded', () => {
         const query = queryInput.value.trim();
         if (!query) return;
 
+        const key = normalizeQuery(query);
+        queryInput.value = '';
+
+        // Double-clicks and resubmits of a question that is still loading are dropped
+        if (inflight.has(key)) return;
+
         // Add user message
         addMessage(query, 'user');
-        queryInput.value = '';
+
+        // A new question supersedes any still loading
+        inflight.forEach((controller) => controller.abort());
+        const controller = new AbortController();
+        inflight.set(key, controller);
 
         // Show loading state
         setLoading(true);
 
         try {
+            const cached = await answerCache.get(key);
+            if (cached) {
+                addStructuredMessage(cached.structured_answer, cached.sources, cached.confidence,
+                    { ...cached.debug, browser_cached: true });
+                return;
+            }
+
             const response = await fetch('/api/query', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                 },
                 body: JSON.stringify({ query }),
+                signal: controller.signal,
             });
 
             const data = await response.json();
 
             if (data.success) {
                 console.log('Results breakdown:', data.debug);
+                if (isCacheable(data)) answerCache.put(key, data);
                 addStructuredMessage(data.structured_answer, data.sources, data.confidence, data.debug);
             } else {
                 addMessage(data.error || 'An error occurred. Please try again.', 'bot', null, null, null, true);
             }
         } catch (error) {
+            if (error.name === 'AbortError') {
+                addMessage(`Skipped "${query}" for your newer question.`, 'bot');
+                return;
+            }
             console.error('Error:', error);
             addMessage('Failed to get a response. Please check your connection and try again.', 'bot', null, null, null, true);
         } finally {
-            setLoading(false);
+            inflight.delete(key);
+            if (inflight.size === 0) {
+                setLoading(false);
+            }
             queryInput.focus();
         }
     });
@@ -92,7 +217,8 @@ document.addEventListener('DOMContentLoaded', () => {
         if (debug) {
             const debugDiv = document.createElement('div');
             debugDiv.className = 'debug-info';
-            debugDiv.innerHTML = `📊 Retrieved: ${debug.arxiv_count} arXiv papers + ${debug.web_count} web sources | Generated by: ${debug.generated_by}`;
+            debugDiv.innerHTML = `📊 Retrieved: ${debug.arxiv_count} arXiv papers + ${debug.web_count} web sources | Generated by: ${debug.generated_by}` +
+                (debug.browser_cached ? ' | ⚡ Cached in your browser' : '');
             contentDiv.appendChild(debugDiv);
         }
 
@@ -203,9 +329,7 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     function setLoading(isLoading) {
-        sendButton.disabled = isLoading;
-        queryInput.disabled = isLoading;
-
+        // Input stays enabled so a new question can supersede a slow one
         if (isLoading) {
             sendText.classList.add('hidden');
             loadingSpinner.classList.remove('hidden');
@@ -0,0 +1,101 @@
+import threading
+import time
+import unittest
+from src.admission import AdmissionController, AdmissionRejected
+
+
+class AdmissionControllerTest(unittest.TestCase):
+
+    def test_admits_up_to_max_concurrent_without_waiting(self):
+        controller = AdmissionController('test', max_concurrent=2, max_queue=1, queue_timeout=1)
+        self.assertEqual(controller.acquire(), 0.0)
+        self.assertEqual(controller.acquire(), 0.0)
+        self.assertEqual(controller.stats()['active'], 2)
+
+    def test_rejects_when_queue_is_full(self):
+        controller = AdmissionController('test', max_concurrent=1, max_queue=0, queue_timeout=1)
+        controller.acquire()
+        with self.assertRaises(AdmissionRejected) as raised:
+            controller.acquire()
+        self.assertIn('queue is full', str(raised.exception))
+        self.assertEqual(controller.stats()['rejected'], 1)
+
+    def test_try_acquire_refuses_without_counting_a_rejection(self):
+        controller = AdmissionController('test', max_concurrent=1, max_queue=5, queue_timeout=1)
+        self.assertTrue(controller.try_acquire())
+        self.assertFalse(controller.try_acquire())
+        self.assertEqual(controller.stats()['rejected'], 0)
+        self.assertEqual(controller.stats()['queue_depth'], 0)
+
+        controller.release()
+        self.assertEqual(controller.acquire(), 0.0)
+
+    def test_waiter_is_rejected_at_its_deadline(self):
+        controller = AdmissionController('test', max_concurrent=1, max_queue=5, queue_timeout=10)
+        controller.acquire()
+        start = time.monotonic()
+        with self.assertRaises(AdmissionRejected):
+            controller.acquire(timeout=0.1)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(controller.stats()['queue_depth'], 0)
+
+    def test_non_finite_timeout_uses_queue_timeout(self):
+        controller = AdmissionController('test', max_concurrent=1, max_queue=5, queue_timeout=0.1)
+        controller.acquire()
+        for timeout in (float('nan'), float('inf')):
+            start = time.monotonic()
+            with self.assertRaises(AdmissionRejected):
+                controller.acquire(timeout=timeout)
+            self.assertLess(time.monotonic() - start, 1)
+
+    def test_waiters_are_admitted_in_arrival_order(self):
+        controller = AdmissionController('test', max_concurrent=1, max_queue=5, queue_timeout=5)
+        controller.acquire()
+        admitted = []
+
+        def waiter(n):
+            controller.acquire()
+            admitted.append(n)
+            controller.release()
+
+        threads = []
+        for n in range(4):
+            thread = threading.Thread(target=waiter, args=(n,))
+            thread.start()
+            threads.append(thread)
+            # Wait until this waiter holds its ticket before starting the next
+            while controller.stats()['queue_depth'] < n + 1:
+                time.sleep(0.001)
+
+        controller.release()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(admitted, [0, 1, 2, 3])
+
+    def test_abandoned_ticket_does_not_block_later_waiters(self):
+        controller = AdmissionController('test', max_concurrent=1, max_queue=5, queue_timeout=5)
+        controller.acquire()
+        outcomes = {}
+
+        def waiter(name, timeout):
+            try:
+                controller.acquire(timeout=timeout)
+                outcomes[name] = 'admitted'
+            except AdmissionRejected:
+                outcomes[name] = 'rejected'
+
+        impatient = threading.Thread(target=waiter, args=('impatient', 0.05))
+        impatient.start()
+        while controller.stats()['queue_depth'] < 1:
+            time.sleep(0.001)
+        patient = threading.Thread(target=waiter, args=('patient', 5))
+        patient.start()
+
+        impatient.join(5)
+        controller.release()
+        patient.join(5)
+        self.assertEqual(outcomes, {'impatient': 'rejected', 'patient': 'admitted'})
+
+
+if __name__ == '__main__':
+    unittest.main()
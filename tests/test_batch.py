@@ -0,0 +1,132 @@
+import unittest
+import zlib
+from typing import List
+import numpy as np
+from src.answer_cache import AnswerCache
+from src.document import Document
+from src.pipeline import QueryPipeline
+from src.query_processor import QueryProcessor
+
+
+def bag_of_words(texts: List[str], dimension: int = 64) -> np.ndarray:
+    """Deterministic L2-normalised word-hash embeddings"""
+    vectors = np.zeros((len(texts), dimension), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in text.lower().split():
+            vectors[row, zlib.crc32(word.encode()) % dimension] += 1
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class FakeArxiv:
+    """Three papers per query, each linking back to the query that found it"""
+
+    max_results = 5
+
+    def __init__(self):
+        self.queries = []
+
+    def search(self, query, background=False, **kwargs):
+        self.queries.append(query)
+        return [Document(f'{query} paper {i}', f'{query} explained', f'https://arxiv.org/{query}/{i}', 'arXiv', 'arXiv')
+                for i in range(3)]
+
+
+class Unconfigured:
+
+    @staticmethod
+    def is_configured() -> bool:
+        return False
+
+    @staticmethod
+    def search(query):
+        return []
+
+
+class NoWeb:
+
+    @staticmethod
+    def search_all(query, query_embedding=None):
+        return []
+
+
+class FakeEngine:
+
+    def __init__(self):
+        self.generated = []
+
+    @staticmethod
+    def encode(texts: List[str]) -> np.ndarray:
+        return bag_of_words(texts)
+
+    def build_index(self, documents: List[Document]):
+        return documents, self.encode([doc.text for doc in documents])
+
+    @staticmethod
+    def top_k_indices(similarities: np.ndarray, top_k: int) -> np.ndarray:
+        return np.argsort(similarities)[::-1][:top_k]
+
+    @staticmethod
+    def collect(entries, indices):
+        return [entries[idx] for idx in indices]
+
+    def generate_answer(self, query: str, retrieved_docs: List[Document], history: str = ''):
+        self.generated.append(query)
+        return {
+            'structured_answer': {'main': {'content': query}},
+            'sources': [doc.as_source() for doc in retrieved_docs],
+            'confidence': 1.0,
+            'generated_by': 'fake'
+        }
+
+
+class BatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.arxiv = FakeArxiv()
+        self.engine = FakeEngine()
+        self.pipeline = QueryPipeline(
+            self.arxiv, Unconfigured(), Unconfigured(), NoWeb(), QueryProcessor(), self.engine,
+            answer_cache=AnswerCache(100, 3600)
+        )
+
+    def test_results_are_in_input_order_and_echo_each_query(self):
+        queries = ['Explain entanglement', 'What is a qubit?', 'How does superposition work?']
+        results = self.pipeline.answer_batch(queries)
+
+        self.assertEqual([item['index'] for item in results], [0, 1, 2])
+        self.assertEqual([item['query'] for item in results], queries)
+
+    def test_identical_queries_share_one_fetch_and_one_answer(self):
+        results = self.pipeline.answer_batch(['What is a qubit?', 'what is a  qubit?', 'Explain entanglement'])
+
+        self.assertEqual(sorted(self.arxiv.queries), ['Explain entanglement', 'What is a qubit?'])
+        self.assertEqual(sorted(self.engine.generated), ['Explain entanglement', 'What is a qubit?'])
+        self.assertEqual(results[1]['query'], 'what is a  qubit?')
+        self.assertEqual(results[0]['sources'], results[1]['sources'])
+
+    def test_each_query_retrieves_only_its_own_candidates(self):
+        queries = ['What is a qubit?', 'Explain entanglement']
+        for query, item in zip(queries, self.pipeline.answer_batch(queries)):
+            self.assertTrue(item['sources'])
+            self.assertTrue(all(source['link'].startswith(f'https://arxiv.org/{query}/') for source in item['sources']))
+
+    def test_rejected_and_empty_queries_become_error_items(self):
+        results = self.pipeline.answer_batch(['', 'best pizza in town', 'What is a qubit?'])
+
+        self.assertEqual(results[0], {'index': 0, 'query': '', 'error': 'No query provided'})
+        self.assertIn('error', results[1])
+        self.assertTrue(results[2]['success'])
+        self.assertEqual(self.arxiv.queries, ['What is a qubit?'])
+
+    def test_cached_answers_skip_the_pipeline(self):
+        self.pipeline.answer_batch(['What is a qubit?'])
+        results = self.pipeline.answer_batch(['What is a qubit?', 'Explain entanglement'])
+
+        self.assertTrue(results[0]['debug']['cached'])
+        self.assertEqual(self.arxiv.queries, ['What is a qubit?', 'Explain entanglement'])
+        self.assertEqual(self.engine.generated, ['What is a qubit?', 'Explain entanglement'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import copy
+import unittest
+from config import Config
+from src.document import Document
+from src.knowledge_base import KnowledgeBase
+
+
+class DocumentTest(unittest.TestCase):
+
+    def test_snippet_is_truncated_once(self):
+        doc = Document('Qubit', 'x' * (Config.SNIPPET_MAX_CHARS + 50), 'https://example.org', 'Web', 'Web')
+        self.assertEqual(len(doc.snippet), Config.SNIPPET_MAX_CHARS)
+        self.assertEqual(doc.text, 'Qubit. ' + 'x' * Config.SNIPPET_MAX_CHARS)
+
+    def test_source_names_are_interned(self):
+        first = Document('A', 'a', 'https://a', ''.join(['Wiki', 'pedia']), ''.join(['W', 'eb']))
+        second = Document('B', 'b', 'https://b', ''.join(['Wikip', 'edia']), ''.join(['We', 'b']))
+        self.assertIs(first.source, second.source)
+        self.assertIs(first.origin, second.origin)
+
+    def test_key_is_link_and_title(self):
+        doc = Document('Qubit', 'snippet', 'https://example.org/qubit', 'Web', 'Web')
+        self.assertEqual(doc.key, ('https://example.org/qubit', 'Qubit'))
+        self.assertEqual(doc.key, Document('Qubit', 'other', 'https://example.org/qubit', 'arXiv', 'arXiv').key)
+
+    def test_copies_are_the_same_instance(self):
+        doc = Document('Qubit', 'snippet', 'https://example.org', 'Web', 'Web')
+        self.assertIs(copy.copy(doc), doc)
+        self.assertIs(copy.deepcopy([doc])[0], doc)
+
+    def test_knowledge_base_text_matches_document_text(self):
+        entry = {'title': 'Qubit', 'snippet': 'y' * (Config.SNIPPET_MAX_CHARS + 10)}
+        doc = Document(entry['title'], entry['snippet'], 'https://example.org', 'Web', 'Web')
+        self.assertEqual(KnowledgeBase.document_text(entry), doc.text)
+
+
+if __name__ == '__main__':
+    unittest.main()
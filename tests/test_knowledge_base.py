@@ -0,0 +1,63 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from config import Config
+from src.knowledge_base import KnowledgeBase
+
+
+class CountingEncoder:
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, texts):
+        self.calls += 1
+        vectors = np.ones((len(texts), 4), dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class KnowledgeBaseEmbeddingsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'knowledge_base.json')
+        shutil.copy(Config.KNOWLEDGE_BASE_PATH, self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_fallback_embeds_once_and_saves_matrix(self):
+        encoder = CountingEncoder()
+        with self.assertLogs('src.knowledge_base', level='ERROR'):
+            first = KnowledgeBase(self.path, encoder=encoder)
+        second = KnowledgeBase(self.path, encoder=encoder)
+
+        self.assertEqual(encoder.calls, 1)
+        self.assertIsInstance(first.embeddings, np.memmap)
+        self.assertIsInstance(second.embeddings, np.memmap)
+        self.assertEqual(second.embeddings.shape, (len(second.entries), 4))
+
+    def test_stale_matrix_is_rebuilt(self):
+        encoder = CountingEncoder()
+        KnowledgeBase(self.path, encoder=encoder)
+
+        with open(self.path, encoding='utf-8') as f:
+            data = json.load(f)
+        data['entries'][0]['title'] += ' (edited)'
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+        KnowledgeBase(self.path, encoder=encoder)
+        KnowledgeBase(self.path, encoder=encoder)
+        self.assertEqual(encoder.calls, 2)
+
+    def test_without_persist_nothing_is_written(self):
+        KnowledgeBase(self.path, encoder=CountingEncoder(), persist=False)
+        self.assertFalse(any(os.path.exists(p) for p in KnowledgeBase.embedding_paths(self.path)))
+
+
+if __name__ == '__main__':
+    unittest.main()
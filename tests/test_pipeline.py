@@ -0,0 +1,48 @@
+import unittest
+import numpy as np
+from src.document import Document
+from src.pipeline import QueryPipeline
+from src.query_processor import QueryProcessor
+from src.session_store import ConversationSession
+
+
+class FollowUpGateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pipeline = QueryPipeline(None, None, None, None, None, rag_engine=None)
+        self.session = ConversationSession('test')
+        documents = [Document(f'Doc {i}', 'qubit', f'https://example.org/{i}', 'Web', 'Web') for i in range(3)]
+        self.session.add_documents(documents, np.eye(3, 4, dtype=np.float32))
+
+    def test_follow_up_relevant_to_session_documents_is_accepted(self):
+        embedding = np.array([0.6, 0.6, 0.0, 0.0], dtype=np.float32)
+        self.assertIsNone(self.pipeline._gate_follow_up('and how is it measured?', embedding, self.session))
+
+    def test_unrelated_follow_up_is_rejected(self):
+        embedding = np.array([0.0, 0.0, 0.0, 1.0], dtype=np.float32)
+        self.assertIsNotNone(self.pipeline._gate_follow_up('give me a lasagna recipe', embedding, self.session))
+
+
+class RejectedQueryEmbeddingTest(unittest.TestCase):
+
+    def test_rejected_query_keeps_the_gate_embedding(self):
+        calls = []
+
+        def encoder(texts):
+            calls.append(list(texts))
+            # Seeds point one way and queries the other, so stage 2 rejects every query
+            column = 0 if len(texts) > 1 else 1
+            vectors = np.zeros((len(texts), 2), dtype=np.float32)
+            vectors[:, column] = 1
+            return vectors
+
+        pipeline = QueryPipeline(None, None, None, None, QueryProcessor(encoder=encoder), rag_engine=None)
+        processed_query, error, embedding = pipeline.validate('and how would you measure it?')
+
+        self.assertIsNotNone(error)
+        np.testing.assert_array_equal(embedding, [0, 1])
+        self.assertEqual(sum(texts == [processed_query] for texts in calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from src.politeness import PolitenessScheduler
+
+
+class PolitenessSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'schedule')
+        self.scheduler = PolitenessScheduler(self.path, min_interval=10, max_wait=5)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_slots_are_spaced_by_min_interval(self):
+        self.assertAlmostEqual(self.scheduler.reserve(), 0, delta=0.1)
+        self.assertEqual(self.scheduler.reserve(), -1)  # next slot is 10 s away, over max_wait
+
+    def test_longer_max_wait_queues_instead_of_refusing(self):
+        self.scheduler.reserve()
+        self.assertAlmostEqual(self.scheduler.reserve(max_wait=60), 10, delta=0.1)
+        self.assertAlmostEqual(self.scheduler.reserve(max_wait=60), 20, delta=0.1)
+
+    def test_background_never_books_beyond_interactive_reach(self):
+        scheduler = PolitenessScheduler(self.path, min_interval=3, max_wait=6, background_max_wait=120)
+        booked = [scheduler.reserve(max_wait=120, background=True) for _ in range(50)]
+
+        # Only the slots within max_wait - min_interval are taken; the rest must retry later
+        self.assertEqual(sum(delay >= 0 for delay in booked), 2)
+        delay = scheduler.reserve()
+        self.assertTrue(0 <= delay <= 6, delay)
+
+    def test_interactive_succeeds_while_background_callers_wait(self):
+        scheduler = PolitenessScheduler(self.path, min_interval=0.2, max_wait=0.5, background_max_wait=30)
+        stop = time.monotonic() + 1.5
+        waiting = []
+
+        def background():
+            while time.monotonic() < stop:
+                waiting.append(scheduler.wait_turn(background=True))
+
+        threads = [threading.Thread(target=background) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.3)
+
+        delays = []
+        for _ in range(3):
+            delay = scheduler.reserve()
+            delays.append(delay)
+            time.sleep(max(delay, 0) + 0.2)
+
+        for thread in threads:
+            thread.join()
+
+        self.assertTrue(all(0 <= delay <= 0.5 for delay in delays), delays)
+        self.assertTrue(all(waiting))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import json
+import os
+import tempfile
+import unittest
+from src.prewarm import QueryPrewarmer
+
+
+class FakePipeline:
+
+    @staticmethod
+    def cache_key(user_query: str) -> str:
+        return user_query.lower()
+
+
+class PrewarmStateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.state_file = os.path.join(self.tmp.name, 'prewarm.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def prewarmer(self) -> QueryPrewarmer:
+        return QueryPrewarmer(FakePipeline(), answer_cache=None, state_file=self.state_file)
+
+    def test_workers_keep_separate_entries(self):
+        first, second = self.prewarmer(), self.prewarmer()
+        for _ in range(3):
+            first.record('What is a qubit?')
+        second.record('What is superposition?')
+
+        first._save_state()
+        second._save_state()
+
+        with open(self.state_file, encoding='utf-8') as f:
+            self.assertEqual(len(json.load(f)['processes']), 2)
+
+        restarted = self.prewarmer()
+        self.assertEqual(restarted._counts['what is a qubit?'], 3)
+        self.assertEqual(restarted._counts['what is superposition?'], 1)
+
+    def test_loaded_counts_are_not_saved_again(self):
+        worker = self.prewarmer()
+        worker.record('What is a qubit?')
+        worker._save_state()
+
+        restarted = self.prewarmer()
+        restarted.record('What is a qubit?')
+        restarted._save_state()
+
+        self.assertEqual(self.prewarmer()._counts['what is a qubit?'], 2)
+
+    def test_reads_single_entry_state_files(self):
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump({'saved_at': 4102444800, 'counts': {'what is a qubit?': 7}}, f)
+        self.assertEqual(self.prewarmer()._counts['what is a qubit?'], 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
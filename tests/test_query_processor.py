@@ -0,0 +1,41 @@
+import unittest
+import numpy as np
+from src.query_processor import QueryProcessor
+
+
+class KeywordGateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.processor = QueryProcessor()
+
+    def accepted_by_keyword(self, query: str) -> bool:
+        return self.processor._keyword_pattern.search(self.processor.process(query)) is not None
+
+    def test_keywords_match_whole_words_only(self):
+        for query in ['How do I write a short cover letter?', 'Best shortbread recipe',
+                      'pauli shore movies', 'cirque du soleil tickets']:
+            self.assertFalse(self.accepted_by_keyword(query), query)
+
+    def test_plural_and_inflected_keywords_match(self):
+        for query in ['What is a qubit?', 'two qubits', 'entangled photons', 'entanglement',
+                      "Explain Shor's algorithm", 'cirq tutorial']:
+            self.assertTrue(self.accepted_by_keyword(query), query)
+
+    def test_classify_batch_embeds_stage_two_queries_together(self):
+        calls = []
+
+        def encoder(texts):
+            calls.append(list(texts))
+            return np.full((len(texts), 4), 0.5, dtype=np.float32)
+
+        processor = QueryProcessor(encoder=encoder)
+        results = processor.classify_batch(['What is a qubit?', 'pauli spin matrices', 'lasagna recipe'])
+
+        self.assertEqual(calls[0], ['pauli spin matrices', 'lasagna recipe'])
+        self.assertEqual(len(calls), 2)  # the queries, then the topic seeds once
+        self.assertEqual(results[0], (True, None))
+        self.assertIsNotNone(results[1][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from unittest import mock
+from src.document import Document
+from src.source_selector import SourceSelector
+
+
+def doc(origin: str) -> Document:
+    return Document('Title', 'snippet', f'https://example.org/{origin}', 'Web', origin)
+
+
+class SourceSelectorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.selector = SourceSelector(exploration_rate=0.1, min_samples=3, min_utility=0.2,
+                                       latency_weight=0.0, costs={}, window=10)
+
+    def train(self, contributing, called=('arXiv', 'SerpAPI'), rounds=3):
+        for _ in range(rounds):
+            self.selector.record_outcome('definition', called, [doc(origin) for origin in contributing])
+
+    def test_sources_without_enough_samples_are_always_called(self):
+        self.train(contributing=['arXiv'], rounds=2)
+        with mock.patch('src.source_selector.random.random', return_value=0.99):
+            self.assertEqual(self.selector.select('definition', ['arXiv', 'SerpAPI']), ['arXiv', 'SerpAPI'])
+
+    def test_low_value_source_is_skipped(self):
+        self.train(contributing=['arXiv'])
+        with mock.patch('src.source_selector.random.random', return_value=0.99):
+            self.assertEqual(self.selector.select('definition', ['arXiv', 'SerpAPI']), ['arXiv'])
+        self.assertEqual(self.selector._skipped['SerpAPI'], 1)
+
+    def test_low_value_source_is_called_when_exploring(self):
+        self.train(contributing=['arXiv'])
+        with mock.patch('src.source_selector.random.random', return_value=0.05):
+            self.assertEqual(self.selector.select('definition', ['arXiv', 'SerpAPI']), ['arXiv', 'SerpAPI'])
+
+    def test_never_skips_every_source(self):
+        self.selector.costs = {'SerpAPI': 0.5}
+        self.train(contributing=[])
+        with mock.patch('src.source_selector.random.random', return_value=0.99):
+            self.assertEqual(self.selector.select('definition', ['arXiv', 'SerpAPI']), ['arXiv'])
+        self.assertEqual(self.selector._skipped['arXiv'], 0)
+
+    def test_outcome_is_attributed_by_document_origin(self):
+        # Knowledge base results are shown as 'Wikipedia' but come through the 'Web' source
+        kb_result = Document('Qubit', 'snippet', 'https://example.org/qubit', source='Wikipedia', origin='Web')
+        self.selector.record_outcome('definition', ['Web', 'arXiv'], [kb_result])
+
+        self.assertEqual(list(self.selector._contributions[('definition', 'Web')]), [True])
+        self.assertEqual(list(self.selector._contributions[('definition', 'arXiv')]), [False])
+        self.assertNotIn(('definition', 'Wikipedia'), self.selector._contributions)
+
+
+if __name__ == '__main__':
+    unittest.main()